@@ -1,10 +1,21 @@
 # app/__init__.py
 
-from flask import Flask, send_from_directory
+from flask import Flask
 from .extensions import db, migrate, cors, ma, jwt
+from .jobs import job_queue
+from .revocation import token_denylist
+from .forecast import forecast_cache
+from .openapi import openapi_response
+from .admin import (
+    user_filter_options, filter_users, stream_users, USER_COLUMNS,
+    ORDER_CHOICES
+)
+from . import sync  # noqa: F401  註冊同步變更紀錄的 event listener
 from flask_swagger_ui import get_swaggerui_blueprint
-import os
 import click
+import csv
+import json
+from sqlalchemy import delete
 
 # Define the path to your OpenAPI spec file
 SWAGGER_URL = '/api/docs'
@@ -24,23 +35,31 @@ def create_app(config_object=None):
     cors.init_app(app)
     ma.init_app(app)
     jwt.init_app(app)
+    job_queue.init_app(app)
+    token_denylist.init_app(app)
+    forecast_cache.init_app(app)
 
     with app.app_context():
         from .api.auth import auth_bp
         from .api.habits import habits_bp
         from .api.moods import moods_bp
+        from .api.jobs import jobs_bp
+        from .api.sync import sync_bp
+        from .api.insights import insights_bp
 
         app.register_blueprint(auth_bp)
         app.register_blueprint(habits_bp)
         app.register_blueprint(moods_bp)
+        app.register_blueprint(jobs_bp)
+        app.register_blueprint(sync_bp)
+        app.register_blueprint(insights_bp)
 
         db.create_all()
 
         @app.route('/openapi.yml')
         def serve_openapi_spec():
-            return send_from_directory(
-                os.path.join(app.root_path, '..', 'static'), 'API_SPEC.yml'
-            )
+            # 規格於第一次請求時由路由與 schema 產生並快取於記憶體
+            return openapi_response(app)
 
         swaggerui_blueprint = get_swaggerui_blueprint(
             SWAGGER_URL,
@@ -52,19 +71,77 @@ def create_app(config_object=None):
     from .models import User
 
     @app.cli.command("show-users")
-    def show_users():
-        """顯示資料庫中的所有使用者。"""
-        users = User.query.all()
-        if not users:
+    @user_filter_options
+    @click.option("--limit", type=int, default=None, help="最多顯示幾位使用者。")
+    def show_users(limit, **filters):
+        """串流顯示資料庫中的使用者 (不含密碼雜湊)。"""
+        shown = 0
+        for user in stream_users(limit=limit, **filters):
+            if not shown:
+                click.echo("--- 資料庫中的使用者 ---")
+            click.echo(
+                f"ID: {user.id}, Username: {user.username}, "
+                f"Email: {user.email}, Created: {user.created_at:%Y-%m-%d}"
+            )
+            shown += 1
+        if not shown:
             click.echo("資料庫中沒有任何使用者。")
             return
-
-        click.echo("--- 資料庫中的使用者 ---")
-        for user in users:
-            click.echo(f"ID: {user.id}, Username: {user.username}, Email: {user.email}")  # noqa: E501
-            click.echo(f"  Password Hash: {user.password_hash}")
         click.echo("------------------------")
 
+    @app.cli.command("user-stats")
+    @user_filter_options
+    @click.option("--limit", type=int, default=None, help="最多顯示幾位使用者。")
+    @click.option(
+        "--order-by", type=click.Choice(ORDER_CHOICES), default="id",
+        show_default=True, help="依 id 或依使用量 (由多到少) 排序。"
+    )
+    def user_stats(limit, order_by, **filters):
+        """顯示每位使用者的習慣數與心情紀錄數。"""
+        users = habits = moods = 0
+        click.echo(f"{'ID':>8}  {'Habits':>6}  {'Moods':>6}  Email")
+        for user in stream_users(
+            counts=True, order_by=order_by, limit=limit, **filters
+        ):
+            click.echo(
+                f"{user.id:>8}  {user.habits:>6}  {user.moods:>6}  "
+                f"{user.email}"
+            )
+            users += 1
+            habits += user.habits
+            moods += user.moods
+        click.echo(f"共 {users} 位使用者、{habits} 個習慣、{moods} 筆心情紀錄。")
+
+    @app.cli.command("export-users")
+    @user_filter_options
+    @click.option("--limit", type=int, default=None, help="最多匯出幾位使用者。")
+    @click.option(
+        "--format", "output_format", type=click.Choice(("csv", "jsonl")),
+        default="csv", show_default=True
+    )
+    @click.option(
+        "--output", type=click.File("w", encoding="utf-8"), default="-",
+        help="輸出檔案，預設為標準輸出。"
+    )
+    def export_users(limit, output_format, output, **filters):
+        """串流匯出使用者與使用量 (不含密碼雜湊)。"""
+        fields = [column.key for column in USER_COLUMNS] + ["habits", "moods"]
+        if output_format == "csv":
+            writer = csv.DictWriter(output, fieldnames=fields)
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(row):
+                output.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+        exported = 0
+        for user in stream_users(counts=True, limit=limit, **filters):
+            row = user._asdict()
+            row["created_at"] = row["created_at"].isoformat()
+            write(row)
+            exported += 1
+        click.echo(f"已匯出 {exported} 位使用者。", err=True)
+
     @app.cli.command("clear-users")
     def clear_users():
         """刪除 users 表格中的所有資料。"""
@@ -76,4 +153,105 @@ def create_app(config_object=None):
             db.session.rollback()
             click.echo(f"刪除時發生錯誤: {e}")
 
+    @app.cli.command("purge-users")
+    @user_filter_options
+    @click.option("--batch-size", default=1000, show_default=True)
+    @click.confirmation_option(prompt="確定要刪除符合條件的使用者及其所有資料？")
+    def purge_users(batch_size, **filters):
+        """分批刪除使用者；關聯資料由資料庫 ON DELETE CASCADE 一併刪除。"""
+        query = filter_users(
+            db.session.query(User.id).order_by(User.id), **filters
+        )
+
+        total = 0
+        while True:
+            ids = [user_id for user_id, in query.limit(batch_size)]
+            if not ids:
+                break
+            db.session.execute(
+                delete(User).where(User.id.in_(ids)),
+                execution_options={"synchronize_session": False}
+            )
+            db.session.commit()
+            total += len(ids)
+            click.echo(f"已刪除 {total} 位使用者...")
+        click.echo(f"成功刪除了 {total} 位使用者。")
+
+    @app.cli.command("serve")
+    @click.option("--bind", default="0.0.0.0:8000", show_default=True)
+    @click.option(
+        "--workers", type=int, default=None,
+        help="worker 行程數，預設為 (2 x CPU 核心數) + 1。"
+    )
+    @click.option("--threads", type=int, default=None)
+    @click.option("--timeout", type=int, default=30, show_default=True)
+    def serve_command(bind, workers, threads, timeout):
+        """以多行程 pre-fork 伺服器 (Gunicorn) 執行應用程式。"""
+        # Gunicorn 不支援 Windows，因此只在此命令中匯入
+        from .server import serve, default_workers
+        workers = workers or app.config.get('SERVER_WORKERS') \
+            or default_workers()
+        threads = threads or app.config.get('SERVER_THREADS', 1)
+        click.echo(f"以 {workers} 個 worker x {threads} 個執行緒在 {bind} 提供服務")
+        serve(app, bind, workers, threads, timeout)
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """建立並重建心情筆記的全文檢索索引 (用於既有資料庫)。"""
+        from .search import create_search_index
+        with db.engine.begin() as connection:
+            create_search_index(connection, rebuild=True)
+        click.echo("全文檢索索引已重建。")
+
+    @app.cli.command("cohort-analytics")
+    @click.option("--chunk-size", default=1000, show_default=True,
+                  help="每個批次處理的使用者數。")
+    @click.option("--workers", type=int, default=None,
+                  help="行程池大小，預設為 CPU 核心數。")
+    @click.option("--min-users", default=5, show_default=True,
+                  help="群組至少需有多少位使用者才會輸出。")
+    def cohort_analytics(chunk_size, workers, min_users):
+        """計算跨使用者的匿名統計並寫入 cohort_stats 表格。"""
+        from .analytics import run_cohort_analytics
+        written = run_cohort_analytics(chunk_size, workers, min_users)
+        click.echo(f"已寫入 {written} 筆彙總統計。")
+
+    @app.cli.command("seed")
+    @click.option("--users", default=1000, show_default=True)
+    @click.option("--habits-per-user", default=10, show_default=True)
+    @click.option("--days", default=3 * 365, show_default=True)
+    @click.option("--seed", "seed_value", default=0, show_default=True,
+                  help="亂數種子；相同的種子產生相同的資料。")
+    @click.option("--chunk-size", default=100, show_default=True,
+                  help="每次批次寫入並提交的使用者數。")
+    def seed(users, habits_per_user, days, seed_value, chunk_size):
+        """以批次寫入產生大量確定性的測試資料。"""
+        from .seed import seed_database, SEED_PASSWORD
+
+        def progress(counts):
+            click.echo(
+                f"已寫入 {counts['users']} 位使用者、{counts['habits']} 個習慣、"
+                f"{counts['habit_logs']} 筆習慣紀錄、"
+                f"{counts['mood_logs']} 筆心情紀錄"
+            )
+
+        seed_database(
+            users=users, habits_per_user=habits_per_user, days=days,
+            seed=seed_value, chunk_size=chunk_size, progress=progress
+        )
+        click.echo(f"完成。所有產生的使用者密碼皆為 {SEED_PASSWORD}")
+
+    @app.cli.command("purge-idempotency-keys")
+    def purge_idempotency_keys():
+        """刪除已過期的 Idempotency-Key 紀錄。"""
+        from .idempotency import purge_expired_keys
+        click.echo(f"已刪除 {purge_expired_keys()} 筆過期的 Idempotency-Key。")
+
+    @app.cli.command("reconcile-habit-stats")
+    def reconcile_habit_stats_command():
+        """依 habit_logs 重新計算並修正習慣的完成統計。"""
+        from .habit_stats import reconcile_habit_stats
+        repaired = reconcile_habit_stats()
+        click.echo(f"已修正 {repaired} 個習慣的完成統計。")
+
     return app
@@ -0,0 +1,79 @@
+# app/admin.py
+
+import click
+from sqlalchemy import select, func
+
+from .extensions import db
+from .models import User, Habit, MoodLog
+
+USER_COLUMNS = (
+    User.id, User.username, User.email, User.timezone, User.created_at
+)
+ORDER_CHOICES = ('id', 'habits', 'moods')
+
+
+def user_filter_options(command):
+    """管理命令共用的篩選選項"""
+    options = [
+        click.option(
+            "--email-like", default=None,
+            help="只包含 email 符合此 LIKE 樣式的帳號。"
+        ),
+        click.option(
+            "--created-after", type=click.DateTime(formats=["%Y-%m-%d"]),
+            default=None, help="只包含在此日期 (含) 之後建立的帳號。"
+        ),
+        click.option(
+            "--created-before", type=click.DateTime(formats=["%Y-%m-%d"]),
+            default=None, help="只包含在此日期之前建立的帳號。"
+        ),
+    ]
+    for option in reversed(options):
+        command = option(command)
+    return command
+
+
+def filter_users(statement, email_like=None, created_after=None,
+                 created_before=None):
+    """套用使用者篩選條件；適用於 Query 與 select()"""
+    if email_like:
+        statement = statement.filter(User.email.like(email_like))
+    if created_after:
+        statement = statement.filter(User.created_at >= created_after)
+    if created_before:
+        statement = statement.filter(User.created_at < created_before)
+    return statement
+
+
+def stream_users(counts=False, order_by='id', limit=None, batch_size=1000,
+                 **filters):
+    """以 yield_per 串流讀取使用者，記憶體用量與表格大小無關。
+
+    counts=True 時以 GROUP BY 彙總的子查詢一併取得每位使用者的習慣數與
+    心情紀錄數，不會逐一存取關聯。回傳 (具名元組式的) Row iterator。
+    """
+    columns = list(USER_COLUMNS)
+    statement = select(*columns)
+    order = {'id': User.id}
+    if counts:
+        habits = select(
+            Habit.user_id, func.count().label('total')
+        ).group_by(Habit.user_id).subquery()
+        moods = select(
+            MoodLog.user_id, func.count().label('total')
+        ).group_by(MoodLog.user_id).subquery()
+        habit_count = func.coalesce(habits.c.total, 0).label('habits')
+        mood_count = func.coalesce(moods.c.total, 0).label('moods')
+        statement = select(*columns, habit_count, mood_count).outerjoin(
+            habits, habits.c.user_id == User.id
+        ).outerjoin(moods, moods.c.user_id == User.id)
+        order['habits'] = habit_count.desc()
+        order['moods'] = mood_count.desc()
+
+    statement = filter_users(statement, **filters).order_by(
+        order[order_by], User.id
+    ).limit(limit)
+    # yield_per 在 PostgreSQL 上使用伺服器端游標分批取回
+    yield from db.session.execute(
+        statement, execution_options={'yield_per': batch_size}
+    )
@@ -0,0 +1,185 @@
+# app/analytics.py
+
+import math
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, UTC
+from itertools import groupby
+from operator import itemgetter
+
+from sqlalchemy import delete, insert, func
+
+from .extensions import db
+from .models import User, Habit, HabitLog, MoodLog, CohortStat
+
+WEEKDAYS = (
+    'monday', 'tuesday', 'wednesday', 'thursday',
+    'friday', 'saturday', 'sunday',
+)
+# 單一使用者至少需要這麼多天的心情紀錄，習慣與心情的相關係數才有意義
+MIN_DAYS_FOR_CORRELATION = 7
+
+
+class Moments:
+    """可合併的統計累加器 (筆數、總和、平方和，以及貢獻的使用者數)"""
+
+    __slots__ = ('count', 'total', 'total_sq', 'users')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.users = 0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.users += other.users
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stddev(self):
+        if self.count < 2:
+            return 0.0
+        variance = (self.total_sq - self.total * self.mean) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+def _pearson(xs, ys):
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    if not var_x or not var_y:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+
+def summarize_chunk(moods, habit_logs):
+    """計算一批使用者的部分統計 (於 worker 行程中執行)。
+
+    moods: 依 user_id 排序的 (user_id, date ordinal, rating)
+    habit_logs: 依 user_id 排序的 (user_id, habit name, date ordinal)
+    回傳 {(metric, key): Moments}。
+    """
+    result = defaultdict(Moments)
+    habits_by_user = {
+        user_id: [(name, day) for _, name, day in rows]
+        for user_id, rows in groupby(habit_logs, key=itemgetter(0))
+    }
+
+    for user_id, rows in groupby(moods, key=itemgetter(0)):
+        ratings = {day: rating for _, day, rating in rows}
+
+        weekdays = set()
+        for day, rating in ratings.items():
+            # date.fromordinal(1) 為週一，因此 (ordinal - 1) % 7 即為星期
+            weekday = WEEKDAYS[(day - 1) % 7]
+            result[('mood_by_weekday', weekday)].add(rating)
+            weekdays.add(weekday)
+        for weekday in weekdays:
+            result[('mood_by_weekday', weekday)].users += 1
+
+        if len(ratings) < MIN_DAYS_FOR_CORRELATION:
+            continue
+        done_days = defaultdict(set)
+        for name, day in habits_by_user.get(user_id, ()):
+            done_days[name].add(day)
+        days = sorted(ratings)
+        ys = [ratings[day] for day in days]
+        for name, done in done_days.items():
+            r = _pearson([day in done for day in days], ys)
+            if r is not None:
+                moments = result[('habit_mood_correlation', name)]
+                moments.add(r)
+                moments.users += 1
+    return dict(result)
+
+
+def _user_id_ranges(chunk_size):
+    """以 yield_per 串流所有 user_id，每 chunk_size 位回傳一個 (起, 迄) 範圍"""
+    ids = db.session.query(User.id).order_by(User.id).yield_per(chunk_size)
+    chunk = []
+    for user_id, in ids:
+        chunk.append(user_id)
+        if len(chunk) == chunk_size:
+            yield chunk[0], chunk[-1]
+            chunk = []
+    if chunk:
+        yield chunk[0], chunk[-1]
+
+
+def _load_chunk(first_id, last_id, batch_size):
+    moods = db.session.query(
+        MoodLog.user_id, MoodLog.log_date, MoodLog.rating
+    ).filter(
+        MoodLog.user_id.between(first_id, last_id)
+    ).order_by(MoodLog.user_id).yield_per(batch_size)
+    habit_logs = db.session.query(
+        Habit.user_id, func.lower(func.trim(Habit.name)), HabitLog.log_date
+    ).join(HabitLog, HabitLog.habit_id == Habit.id).filter(
+        Habit.user_id.between(first_id, last_id)
+    ).order_by(Habit.user_id).yield_per(batch_size)
+    return (
+        [(u, day.toordinal(), rating) for u, day, rating in moods],
+        [(u, name, day.toordinal()) for u, name, day in habit_logs],
+    )
+
+
+def run_cohort_analytics(
+    chunk_size=1000, workers=None, min_users=5, batch_size=5000
+):
+    """以行程池分批計算跨使用者的匿名統計，並覆寫 cohort_stats 表格。
+
+    同時進行中的批次數量受 worker 數量限制，因此記憶體用量與總資料量無關。
+    回傳寫入的列數。
+    """
+    totals = defaultdict(Moments)
+
+    def merge(partial):
+        for key, moments in partial.items():
+            totals[key].merge(moments)
+
+    workers = workers or os.cpu_count()
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for first_id, last_id in _user_id_ranges(chunk_size):
+            moods, habit_logs = _load_chunk(first_id, last_id, batch_size)
+            pending.append(pool.submit(summarize_chunk, moods, habit_logs))
+            if len(pending) >= max_in_flight:
+                merge(pending.pop(0).result())
+        for future in pending:
+            merge(future.result())
+
+    computed_at = datetime.now(UTC)
+    rows = [
+        {
+            'metric': metric,
+            'key': key,
+            'users': moments.users,
+            'samples': moments.count,
+            'mean': moments.mean,
+            'stddev': moments.stddev,
+            'computed_at': computed_at,
+        }
+        for (metric, key), moments in sorted(totals.items())
+        # 人數太少的群組可能識別出個人，不予輸出
+        if moments.users >= min_users
+    ]
+    db.session.execute(delete(CohortStat))
+    if rows:
+        db.session.execute(insert(CohortStat), rows)
+    db.session.commit()
+    return len(rows)
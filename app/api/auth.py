@@ -4,18 +4,28 @@ from flask import Blueprint, jsonify, request
 from werkzeug.security import generate_password_hash, check_password_hash
 from marshmallow import ValidationError
 from flask_jwt_extended import (
-    create_access_token, jwt_required, get_jwt_identity
+    create_access_token, jwt_required, get_jwt_identity, get_jwt
 )
 from app.extensions import db
-from app.models import User
-from app.schemas import UserSchema
+from app.models import User, DEFAULT_TIMEZONE
+from app.schemas import UserSchema, LoginSchema
+from app.openapi import api_doc
+from app.readonly import select_rows
+from app.revocation import token_denylist
 
 
 auth_bp = Blueprint('auth_bp', __name__, url_prefix='/api/v1')
 user_schema = UserSchema()
+# 目前僅開放修改時區
+user_settings_schema = UserSchema(only=("timezone",))
+login_schema = LoginSchema()
 
 
 @auth_bp.route('/auth/register', methods=['POST'])
+@api_doc(
+    body=user_schema, returns=user_schema, status=201, public=True,
+    errors=(400, 409)
+)
 def register_user():
     """使用者註冊"""
     json_data = request.get_json()
@@ -37,7 +47,8 @@ def register_user():
     new_user = User(
         username=data['username'],
         email=data['email'],
-        password_hash=hashed_password
+        password_hash=hashed_password,
+        timezone=data.get('timezone', DEFAULT_TIMEZONE)
     )
 
     db.session.add(new_user)
@@ -47,30 +58,70 @@ def register_user():
 
 
 @auth_bp.route('/auth/login', methods=['POST'])
+@api_doc(
+    body=login_schema, returns=login_schema, public=True, errors=(400, 401)
+)
 def login_user():
     """使用者登入並返回 JWT"""
-    data = request.get_json()
-    email = data.get('email')
-    password = data.get('password')
-
-    if not email or not password:
+    try:
+        data = login_schema.load(request.get_json() or {})
+    except ValidationError:
         return jsonify({"message": "Missing email or password"}), 400
+    email = data['email']
+    password = data['password']
 
     user = User.query.filter_by(email=email).first()
 
     if user and check_password_hash(user.password_hash, password):
         access_token = create_access_token(identity=str(user.id))
-        return jsonify(user=user_schema.dump(user), token=access_token), 200
+        return jsonify(
+            login_schema.dump({"user": user, "token": access_token})
+        ), 200
     else:
         return jsonify({"message": "Invalid credentials"}), 401
 
 
+@auth_bp.route('/auth/logout', methods=['POST'])
+@api_doc()
+@jwt_required()
+def logout_user():
+    """使用者登出並撤銷目前的 JWT"""
+    token_denylist.revoke(get_jwt(), int(get_jwt_identity()))
+    return jsonify({"message": "Successfully logged out"}), 200
+
+
 @auth_bp.route('/users/me', methods=['GET'])
+@api_doc(returns=user_schema, errors=(404,))
 @jwt_required()
 def get_current_user():
     """獲取當前登入使用者的資訊"""
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = select_rows(
+        user_schema, User, User.id == current_user_id
+    ).first()
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+    return jsonify(user_schema.dump(user)), 200
+
+
+@auth_bp.route('/users/me', methods=['PATCH'])
+@api_doc(
+    body=user_settings_schema, returns=user_schema, errors=(400, 404)
+)
+@jwt_required()
+def update_current_user():
+    """更新當前使用者的設定"""
+    user = User.query.get(get_jwt_identity())
     if not user:
         return jsonify({"message": "User not found"}), 404
+
+    try:
+        data = user_settings_schema.load(request.get_json() or {})
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    for key, value in data.items():
+        setattr(user, key, value)
+    db.session.commit()
+
     return jsonify(user_schema.dump(user)), 200
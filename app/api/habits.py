@@ -1,38 +1,93 @@
 # app/api/habits.py
 
 from flask import Blueprint, jsonify, request
-from app.extensions import db
-from app.models import Habit, HabitLog
-from app.schemas import HabitSchema, HabitLogSchema
+from app.extensions import db, begin_write
+from app.models import Habit
+from app.schemas import (
+    HabitSchema, HabitLogSchema, HabitBatchResultSchema, HabitIdsSchema
+)
+from app.habit_stats import record_completion
 from marshmallow import ValidationError
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.openapi import api_doc
+from app.idempotency import idempotent
+from app.forecast import forecast_cache
+from app.readonly import select_rows
 
 
 habits_bp = Blueprint('habits_bp', __name__, url_prefix='/api/v1/habits')
 habit_schema = HabitSchema()
 habits_schema = HabitSchema(many=True)
+habit_updates_schema = HabitSchema(many=True, partial=True)
+habit_ids_schema = HabitIdsSchema()
+batch_results_schema = HabitBatchResultSchema(many=True)
 habit_log_schema = HabitLogSchema()
 
+BATCH_MAX_SIZE = 100
+# 用戶端不可修改的欄位
+PROTECTED_FIELDS = ('id', 'user_id')
+
+
+def _editable(data):
+    # 非物件的內容原樣交給 schema，由 marshmallow 回報 Invalid input type
+    if not isinstance(data, dict):
+        return data
+    return {k: v for k, v in data.items() if k not in PROTECTED_FIELDS}
+
+
+def _batch_items(json_data):
+    """檢查批次請求內容，回傳錯誤回應或 None"""
+    if not isinstance(json_data, list) or not json_data:
+        return jsonify({"message": "Expected a non-empty list"}), 400
+    if len(json_data) > BATCH_MAX_SIZE:
+        return jsonify({
+            "message": f"A batch may contain at most {BATCH_MAX_SIZE} items"
+        }), 400
+    return None
+
+
+def _valid_ids(ids):
+    # bool 是 int 的子類別，但不是合法的 id
+    return all(
+        isinstance(habit_id, int) and not isinstance(habit_id, bool)
+        for habit_id in ids
+    )
+
+
+def _batch_failed(errors):
+    return jsonify({
+        "message": "No changes were applied",
+        "errors": sorted(errors, key=lambda error: error["index"]),
+    }), 422
+
 
 @habits_bp.route('', methods=['GET'])
+@api_doc(returns=habits_schema)
 @jwt_required()
 def list_habits():
     """取得所有習慣"""
     user_id = get_jwt_identity()
-    habits = Habit.query.filter_by(user_id=user_id).all()
+    habits = select_rows(
+        habits_schema, Habit, Habit.user_id == user_id
+    ).all()
     return jsonify(habits_schema.dump(habits)), 200
 
 
 @habits_bp.route('', methods=['POST'])
+@api_doc(
+    body=habit_schema, returns=habit_schema, status=201, errors=(400, 422)
+)
 @jwt_required()
+@idempotent
 def create_habit():
     """建立新習慣"""
     user_id = get_jwt_identity()
     json_data = request.get_json()
 
     try:
-        # 驗證和反序列化
-        new_habit = habit_schema.load(json_data)
+        # 驗證和反序列化；忽略 id，避免載入 (並接管) 既有的習慣
+        new_habit = habit_schema.load(_editable(json_data))
         new_habit.user_id = user_id  # 設置 user_id
     except ValidationError as err:
         return jsonify(err.messages), 422
@@ -43,12 +98,144 @@ def create_habit():
     return jsonify(habit_schema.dump(new_habit)), 201
 
 
+@habits_bp.route('/batch', methods=['POST'])
+@api_doc(
+    body=habits_schema, returns=batch_results_schema, status=201,
+    errors=(400, 422)
+)
+@jwt_required()
+@idempotent
+def create_habits_batch():
+    """在單一交易中建立多個習慣"""
+    user_id = get_jwt_identity()
+    json_data = request.get_json()
+    error = _batch_items(json_data)
+    if error:
+        return error
+    if not all(isinstance(item, dict) for item in json_data):
+        return jsonify({"message": "Every item must be an object"}), 400
+
+    try:
+        new_habits = habits_schema.load(
+            [_editable(item) for item in json_data]
+        )
+    except ValidationError as err:
+        return _batch_failed([
+            {"index": index, "status": 422, "errors": messages}
+            for index, messages in err.messages.items()
+        ])
+
+    for habit in new_habits:
+        habit.user_id = user_id
+    db.session.add_all(new_habits)
+    db.session.commit()
+
+    return jsonify([
+        {"index": index, "status": 201, "habit": habit_schema.dump(habit)}
+        for index, habit in enumerate(new_habits)
+    ]), 201
+
+
+@habits_bp.route('/batch', methods=['PATCH'])
+@api_doc(
+    body=habit_updates_schema, returns=batch_results_schema,
+    errors=(400, 422)
+)
+@jwt_required()
+def update_habits_batch():
+    """在單一交易中更新多個習慣；任一項失敗則全部不套用"""
+    user_id = get_jwt_identity()
+    json_data = request.get_json()
+    error = _batch_items(json_data)
+    if error:
+        return error
+    if not all(isinstance(item, dict) for item in json_data):
+        return jsonify({"message": "Every item must be an object"}), 400
+
+    ids = [item.get('id') for item in json_data]
+    if not _valid_ids(ids):
+        return jsonify({"message": "Every item needs an integer id"}), 400
+    items = [_editable(item) for item in json_data]
+    errors = [
+        {"index": index, "status": 422, "errors": messages}
+        for index, messages in habit_updates_schema.validate(items).items()
+    ]
+    # 以單一查詢確認所有權
+    owned = {
+        habit.id: habit for habit in Habit.query.filter(
+            Habit.user_id == user_id, Habit.id.in_(ids)
+        )
+    }
+    failed = {error["index"] for error in errors}
+    errors += [
+        {"index": index, "id": habit_id, "status": 404,
+         "message": "Habit not found"}
+        for index, habit_id in enumerate(ids)
+        if index not in failed and habit_id not in owned
+    ]
+    if errors:
+        return _batch_failed(errors)
+
+    for habit_id, item in zip(ids, items):
+        habit_schema.load(item, instance=owned[habit_id], partial=True)
+    db.session.commit()
+
+    return jsonify([
+        {"index": index, "status": 200,
+         "habit": habit_schema.dump(owned[habit_id])}
+        for index, habit_id in enumerate(ids)
+    ]), 200
+
+
+@habits_bp.route('/batch', methods=['DELETE'])
+@api_doc(
+    body=habit_ids_schema, returns=batch_results_schema, errors=(400, 422)
+)
+@jwt_required()
+def delete_habits_batch():
+    """在單一交易中刪除多個習慣；任一項不存在則全部不刪除"""
+    user_id = get_jwt_identity()
+    json_data = request.get_json()
+    ids = json_data.get('ids') if isinstance(json_data, dict) else None
+    error = _batch_items(ids)
+    if error:
+        return error
+    if not _valid_ids(ids):
+        return jsonify({"message": "ids must be integers"}), 400
+
+    owned = {
+        habit.id: habit for habit in Habit.query.filter(
+            Habit.user_id == user_id, Habit.id.in_(ids)
+        )
+    }
+    errors = [
+        {"index": index, "id": habit_id, "status": 404,
+         "message": "Habit not found"}
+        for index, habit_id in enumerate(ids) if habit_id not in owned
+    ]
+    if errors:
+        return _batch_failed(errors)
+
+    # 習慣紀錄由 ON DELETE CASCADE 刪除，不會逐筆載入
+    for habit in owned.values():
+        db.session.delete(habit)
+    db.session.commit()
+
+    return jsonify([
+        {"index": index, "id": habit_id, "status": 204}
+        for index, habit_id in enumerate(ids)
+    ]), 200
+
+
 @habits_bp.route('/<int:habit_id>', methods=['GET'])
+@api_doc(returns=habit_schema, errors=(404,))
 @jwt_required()
 def get_habit(habit_id):
     """取得特定習慣"""
     user_id = get_jwt_identity()
-    habit = Habit.query.filter_by(id=habit_id, user_id=user_id).first()
+    habit = select_rows(
+        habit_schema, Habit, Habit.id == habit_id, Habit.user_id == user_id
+    ).first()
 
     if not habit:
         return jsonify({"message": "Habit not found"}), 404
@@ -57,6 +244,7 @@ def get_habit(habit_id):
 
 
 @habits_bp.route('/<int:habit_id>', methods=['PUT'])
+@api_doc(body=habit_schema, returns=habit_schema, errors=(404, 422))
 @jwt_required()
 def update_habit(habit_id):
     """更新特定習慣"""
@@ -69,21 +257,18 @@ def update_habit(habit_id):
     json_data = request.get_json()
 
     try:
-        # 驗證和反序列化，partial=True 允許部分更新
-        updated_data = habit_schema.load(json_data, partial=True)
+        # 驗證並直接更新 habit 物件，partial=True 允許部分更新
+        habit_schema.load(_editable(json_data), instance=habit, partial=True)
     except ValidationError as err:
         return jsonify(err.messages), 422
 
-    # 更新 habit 物件
-    for key, value in updated_data.items():
-        setattr(habit, key, value)
-
     db.session.commit()
 
     return jsonify(habit_schema.dump(habit)), 200
 
 
 @habits_bp.route('/<int:habit_id>', methods=['DELETE'])
+@api_doc(status=204, errors=(404,))
 @jwt_required()
 def delete_habit(habit_id):
     """刪除特定習慣"""
@@ -100,28 +285,42 @@ def delete_habit(habit_id):
 
 
 @habits_bp.route('/<int:habit_id>/track', methods=['POST'])
+@api_doc(
+    body=habit_log_schema, returns=habit_log_schema, status=201,
+    errors=(404, 409, 422)
+)
 @jwt_required()
+@idempotent
 def track_habit(habit_id):
     """追蹤習慣"""
-    # 雖然這個函式沒有直接用到 user_id，但加上 JWT 保護可以確保只有登入的使用者才能追蹤
-    # user_id = get_jwt_identity()
+    user_id = get_jwt_identity()
+    # 鎖定習慣列，讓完成統計的更新在並行打卡時保持一致
+    begin_write()
+    habit = Habit.query.filter_by(
+        id=habit_id, user_id=user_id
+    ).with_for_update().first()
+    if not habit:
+        db.session.rollback()
+        return jsonify({"message": "Habit not found"}), 404
+
     json_data = request.get_json()
     try:
         new_log = habit_log_schema.load(json_data)
         new_log.habit_id = habit_id
     except ValidationError as err:
+        db.session.rollback()
         return jsonify(err.messages), 422
 
-    # 檢查是否已存在相同日期的紀錄
-    existing_log = HabitLog.query.filter_by(
-        habit_id=habit_id, log_date=new_log.log_date
-    ).first()
-    if existing_log:
+    # 重複的日期由唯一約束擋下，不需先查詢；並行的重複請求也因此回傳 409
+    try:
+        db.session.add(new_log)
+        record_completion(habit, new_log.log_date)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
         return jsonify({
             "message": "A log for this habit on this date already exists."
         }), 409
-
-    db.session.add(new_log)
-    db.session.commit()
+    forecast_cache.observe_completion(int(user_id), new_log)
 
     return jsonify(habit_log_schema.dump(new_log)), 201
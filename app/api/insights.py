@@ -0,0 +1,76 @@
+# app/api/insights.py
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy import select
+from app.extensions import db
+from app.forecast import forecast_cache, MIN_SAMPLES, ONE_DAY
+from app.models import User, Habit, MoodLog, to_local_date, utcnow
+from app.schemas import ForecastSchema, ForecastQuerySchema
+from marshmallow import ValidationError
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.openapi import api_doc
+
+
+insights_bp = Blueprint(
+    'insights_bp', __name__, url_prefix='/api/v1/insights'
+)
+forecast_schema = ForecastSchema()
+forecast_query_schema = ForecastQuerySchema()
+
+
+@insights_bp.route('/forecast', methods=['GET'])
+@api_doc(
+    returns=forecast_schema, query=forecast_query_schema,
+    errors=(400, 404, 422)
+)
+@jwt_required()
+def forecast_mood():
+    """預測今天完成指定習慣 (habit_id，可重複) 後的心情"""
+    user_id = int(get_jwt_identity())
+    try:
+        selected = forecast_query_schema.load(request.args)['habit_id']
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    user = db.session.get(User, user_id)
+    if not user:
+        return jsonify({"message": "User not found"}), 404
+
+    names = dict(db.session.execute(
+        select(Habit.id, Habit.name).where(
+            Habit.user_id == user_id
+        ).order_by(Habit.id)
+    ).all())
+    if any(habit_id not in names for habit_id in selected):
+        return jsonify({"message": "Habit not found"}), 404
+
+    model = forecast_cache.get(user_id, names)
+    if model is None:
+        return jsonify({
+            "message": f"At least {MIN_SAMPLES} mood logs are needed "
+                       "for a forecast"
+        }), 422
+
+    today = to_local_date(utcnow(), user.timezone)
+    previous = db.session.execute(
+        select(MoodLog.rating).where(
+            MoodLog.user_id == user_id,
+            MoodLog.log_date == today - ONE_DAY
+        )
+    ).scalar()
+    return jsonify(forecast_schema.dump({
+        "date": today,
+        "samples": model.samples,
+        "previous_rating": previous,
+        "lag_effect": float(model.coef[-1]),
+        "baseline": model.predict([], previous),
+        "predicted": model.predict(selected, previous),
+        "habits": [
+            {
+                "habit_id": habit_id,
+                "name": names[habit_id],
+                "effect": float(model.coef[column + 1]),
+                "predicted": model.predict([habit_id], previous),
+            }
+            for habit_id, column in model.columns.items()
+        ],
+    })), 200
@@ -0,0 +1,51 @@
+# app/api/jobs.py
+
+from flask import Blueprint, jsonify, request
+from app.jobs import job_queue
+from app.models import Job
+from app.schemas import JobSchema
+from marshmallow import ValidationError
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.openapi import api_doc
+
+
+jobs_bp = Blueprint('jobs_bp', __name__, url_prefix='/api/v1/jobs')
+job_schema = JobSchema()
+
+
+@jobs_bp.route('', methods=['POST'])
+# 202: 已建立新工作；200: 已有相同的待處理工作，回傳該工作
+@api_doc(
+    body=job_schema, returns=job_schema, status=(202, 200), errors=(400,)
+)
+@jwt_required()
+def create_job():
+    """提交背景工作"""
+    user_id = int(get_jwt_identity())
+    json_data = request.get_json()
+    if not json_data:
+        return jsonify({"message": "No input data provided"}), 400
+
+    try:
+        data = job_schema.load(json_data)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    job, created = job_queue.submit(
+        user_id, data['kind'], data['params'], data['priority']
+    )
+    return jsonify(job_schema.dump(job)), 202 if created else 200
+
+
+@jobs_bp.route('/<int:job_id>', methods=['GET'])
+@api_doc(returns=job_schema, errors=(404,))
+@jwt_required()
+def get_job(job_id):
+    """取得背景工作狀態與結果"""
+    user_id = get_jwt_identity()
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+
+    return jsonify(job_schema.dump(job)), 200
@@ -1,29 +1,167 @@
 # app/api/moods.py
 
+from datetime import date
 from flask import Blueprint, jsonify, request
+from sqlalchemy import func, cast, Date
 from app.extensions import db
-from app.models import MoodLog
-from app.schemas import MoodLogSchema
+from app.models import MoodLog, Habit, HabitLog
+from app.schemas import (
+    MoodLogSchema, MoodSummaryQuerySchema, MoodSummarySchema,
+    MoodSearchQuerySchema, MoodSearchResultSchema
+)
+from app.search import search_mood_notes
 from marshmallow import ValidationError
+from sqlalchemy.exc import IntegrityError
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.openapi import api_doc
+from app.idempotency import idempotent
+from app.forecast import forecast_cache
+from app.readonly import select_rows
 
 
 moods_bp = Blueprint('moods_bp', __name__, url_prefix='/api/v1/moods')
 mood_log_schema = MoodLogSchema()
 mood_logs_schema = MoodLogSchema(many=True)
+summary_query_schema = MoodSummaryQuerySchema()
+summaries_schema = MoodSummarySchema(many=True)
+search_query_schema = MoodSearchQuerySchema()
+search_result_schema = MoodSearchResultSchema()
+
+
+def _bucket_expr(column, bucket):
+    """依資料庫方言將日期欄位截斷至週 (週一) 或月的第一天"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return cast(func.date_trunc(bucket, column), Date)
+    if bucket == 'week':
+        return func.date(column, 'weekday 0', '-6 days')
+    return func.strftime('%Y-%m-01', column)
+
+
+def _bucket_key(value):
+    # SQLite 回傳字串，PostgreSQL 回傳 date
+    return value.isoformat() if isinstance(value, date) else str(value)
 
 
 @moods_bp.route('', methods=['GET'])
+@api_doc(returns=mood_logs_schema)
 @jwt_required()
 def list_moods():
     """取得所有心情紀錄"""
     user_id = get_jwt_identity()
-    moods = MoodLog.query.filter_by(user_id=user_id).all()
+    moods = select_rows(
+        mood_logs_schema, MoodLog, MoodLog.user_id == user_id
+    ).all()
     return jsonify(mood_logs_schema.dump(moods)), 200
 
 
+@moods_bp.route('/summary', methods=['GET'])
+@api_doc(
+    query=summary_query_schema, returns=summaries_schema, errors=(400,)
+)
+@jwt_required()
+def summarize_moods():
+    """依週或月彙總心情評分與習慣完成次數；以使用者日曆上的日期分組"""
+    user_id = get_jwt_identity()
+    try:
+        args = summary_query_schema.load(request.args)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    bucket = args['bucket']
+    date_from = args.get('date_from')
+    date_to = args.get('date_to')
+
+    mood_bucket = _bucket_expr(MoodLog.log_date, bucket).label('bucket')
+    mood_query = db.session.query(
+        mood_bucket,
+        func.count(),
+        func.avg(MoodLog.rating),
+        func.min(MoodLog.rating),
+        func.max(MoodLog.rating),
+    ).filter(MoodLog.user_id == user_id)
+
+    habit_bucket = _bucket_expr(HabitLog.log_date, bucket).label('bucket')
+    habit_query = db.session.query(
+        habit_bucket, func.count()
+    ).join(Habit, Habit.id == HabitLog.habit_id).filter(
+        Habit.user_id == user_id
+    )
+
+    if date_from:
+        mood_query = mood_query.filter(MoodLog.log_date >= date_from)
+        habit_query = habit_query.filter(HabitLog.log_date >= date_from)
+    if date_to:
+        mood_query = mood_query.filter(MoodLog.log_date <= date_to)
+        habit_query = habit_query.filter(HabitLog.log_date <= date_to)
+
+    summary = {}
+    for key, count, avg, low, high in mood_query.group_by(mood_bucket):
+        summary[_bucket_key(key)] = {
+            "bucket": _bucket_key(key),
+            "mood_count": count,
+            "avg_rating": round(float(avg), 2),
+            "min_rating": low,
+            "max_rating": high,
+            "habit_completions": 0,
+        }
+    for key, count in habit_query.group_by(habit_bucket):
+        entry = summary.setdefault(_bucket_key(key), {
+            "bucket": _bucket_key(key),
+            "mood_count": 0,
+            "avg_rating": None,
+            "min_rating": None,
+            "max_rating": None,
+            "habit_completions": 0,
+        })
+        entry["habit_completions"] = count
+
+    return jsonify(
+        summaries_schema.dump([summary[key] for key in sorted(summary)])
+    ), 200
+
+
+@moods_bp.route('/search', methods=['GET'])
+@api_doc(
+    query=search_query_schema, returns=search_result_schema, errors=(400,)
+)
+@jwt_required()
+def search_moods():
+    """以全文檢索搜尋心情筆記"""
+    user_id = int(get_jwt_identity())
+    try:
+        args = search_query_schema.load(request.args)
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+    query, page, per_page = args['q'], args['page'], args['per_page']
+
+    # 多取一筆以判斷是否還有下一頁，不需額外的 COUNT 查詢
+    rows = search_mood_notes(
+        user_id, query, limit=per_page + 1, offset=(page - 1) * per_page
+    )
+    items = [
+        {
+            "id": row["id"],
+            "log_date": str(row["log_date"]),
+            "rating": row["rating"],
+            "notes": row["notes"],
+            "snippet": row["snippet"],
+        }
+        for row in rows[:per_page]
+    ]
+    return jsonify(search_result_schema.dump({
+        "items": items,
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(rows) > per_page,
+    })), 200
+
+
 @moods_bp.route('', methods=['POST'])
+@api_doc(
+    body=mood_log_schema, returns=mood_log_schema, status=201,
+    errors=(400, 409)
+)
 @jwt_required()
+@idempotent
 def create_mood():
     """建立新心情紀錄"""
     user_id = get_jwt_identity()
@@ -40,27 +178,30 @@ def create_mood():
     except ValidationError as err:
         return jsonify(err.messages), 400
 
-    # 檢查是否已存在相同日期的紀錄
-    existing_log = MoodLog.query.filter_by(
-        user_id=user_id, log_date=new_mood.log_date
-    ).first()
-    if existing_log:
+    # 重複的日期由唯一約束擋下，不需先查詢；並行的重複請求也因此回傳 409
+    try:
+        db.session.add(new_mood)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
         return jsonify({
             "message": "A mood log for this date already exists."
         }), 409
-
-    db.session.add(new_mood)
-    db.session.commit()
+    forecast_cache.observe_mood(int(user_id), new_mood)
 
     return jsonify(mood_log_schema.dump(new_mood)), 201
 
 
 @moods_bp.route('/<int:mood_id>', methods=['GET'])
+@api_doc(returns=mood_log_schema, errors=(404,))
 @jwt_required()
 def get_mood(mood_id):
     """取得特定心情紀錄"""
     user_id = get_jwt_identity()
-    mood = MoodLog.query.filter_by(id=mood_id, user_id=user_id).first()
+    mood = select_rows(
+        mood_log_schema, MoodLog,
+        MoodLog.id == mood_id, MoodLog.user_id == user_id
+    ).first()
 
     if not mood:
         return jsonify({"message": "Mood entry not found"}), 404
@@ -69,6 +210,9 @@ def get_mood(mood_id):
 
 
 @moods_bp.route('/<int:mood_id>', methods=['PUT'])
+@api_doc(
+    body=mood_log_schema, returns=mood_log_schema, errors=(400, 404)
+)
 @jwt_required()
 def update_mood(mood_id):
     """更新特定心情紀錄"""
@@ -95,6 +239,7 @@ def update_mood(mood_id):
 
 
 @moods_bp.route('/<int:mood_id>', methods=['DELETE'])
+@api_doc(status=204, errors=(404,))
 @jwt_required()
 def delete_mood(mood_id):
     """刪除特定心情紀錄"""
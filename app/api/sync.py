@@ -0,0 +1,278 @@
+# app/api/sync.py
+
+from flask import Blueprint, jsonify, request
+from sqlalchemy.exc import IntegrityError
+from app.extensions import db
+from app.models import ChangeLog, Habit, HabitLog, MoodLog
+from app.schemas import (
+    HabitSchema, HabitLogSchema, MoodLogSchema, SyncSchema, SyncQuerySchema
+)
+from app.habit_stats import refresh_habit_stats
+from app.sync import current_token
+from marshmallow import ValidationError
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.openapi import api_doc
+
+
+sync_bp = Blueprint('sync_bp', __name__, url_prefix='/api/v1/sync')
+habit_schema = HabitSchema()
+habit_log_schema = HabitLogSchema()
+mood_log_schema = MoodLogSchema()
+sync_schema = SyncSchema()
+sync_query_schema = SyncQuerySchema()
+ENTITIES = ('habits', 'habit_logs', 'mood_logs')
+
+
+class SyncNotFound(Exception):
+    pass
+
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _envelope_error(json_data):
+    """檢查推送內容的結構，回傳錯誤訊息或 None"""
+    if not isinstance(json_data, dict):
+        return "Expected an object"
+    for key in ENTITIES:
+        items = json_data.get(key, [])
+        if not isinstance(items, list) or not all(
+            isinstance(item, dict) for item in items
+        ):
+            return f"{key} must be a list of objects"
+        for item in items:
+            for field in ('id', 'habit_id'):
+                if field in item and not _is_id(item[field]):
+                    return f"{key}: {field} must be an integer"
+    deleted = json_data.get('deleted', {})
+    if not isinstance(deleted, dict):
+        return "deleted must be an object"
+    for key in ENTITIES:
+        ids = deleted.get(key, [])
+        if not isinstance(ids, list) or not all(_is_id(i) for i in ids):
+            return f"deleted.{key} must be a list of integer ids"
+    return None
+
+
+def _owned_habit_logs(user_id, ids):
+    return HabitLog.query.join(Habit).filter(
+        Habit.user_id == user_id, HabitLog.id.in_(ids)
+    )
+
+
+def _sync_payload(token, habits, habit_logs, mood_logs, deleted=None):
+    return sync_schema.dump({
+        'token': token,
+        'habits': habits,
+        'habit_logs': habit_logs,
+        'mood_logs': mood_logs,
+        'deleted': deleted or {key: [] for key in ENTITIES},
+    })
+
+
+@sync_bp.route('', methods=['GET'])
+@api_doc(returns=sync_schema, query=sync_query_schema, errors=(400,))
+@jwt_required()
+def pull_changes():
+    """取得指定 token 之後的變更；未提供 token 時回傳完整資料"""
+    user_id = int(get_jwt_identity())
+    try:
+        since = sync_query_schema.load(request.args)['since']
+    except ValidationError as err:
+        return jsonify(err.messages), 400
+
+    if since <= 0:
+        token = current_token(user_id)
+        return jsonify(_sync_payload(
+            token,
+            Habit.query.filter_by(user_id=user_id).all(),
+            HabitLog.query.join(Habit).filter(Habit.user_id == user_id).all(),
+            MoodLog.query.filter_by(user_id=user_id).all(),
+        )), 200
+
+    changes = ChangeLog.query.filter(
+        ChangeLog.user_id == user_id, ChangeLog.id > since
+    ).all()
+    updated = {key: [] for key in ENTITIES}
+    deleted = {key: [] for key in ENTITIES}
+    for change in changes:
+        target = deleted if change.deleted else updated
+        target[change.entity].append(change.entity_id)
+
+    habits = habit_logs = mood_logs = []
+    if updated['habits']:
+        habits = Habit.query.filter(
+            Habit.user_id == user_id, Habit.id.in_(updated['habits'])
+        ).all()
+    if updated['habit_logs']:
+        habit_logs = _owned_habit_logs(
+            user_id, updated['habit_logs']
+        ).all()
+    if updated['mood_logs']:
+        mood_logs = MoodLog.query.filter(
+            MoodLog.user_id == user_id,
+            MoodLog.id.in_(updated['mood_logs'])
+        ).all()
+
+    token = max((change.id for change in changes), default=since)
+    return jsonify(
+        _sync_payload(token, habits, habit_logs, mood_logs, deleted)
+    ), 200
+
+
+def _load_item(key, index, schema, item, **kwargs):
+    # 不允許用戶端指定 id 或 user_id
+    data = {k: v for k, v in item.items() if k not in ('id', 'user_id')}
+    try:
+        return schema.load(data, **kwargs)
+    except ValidationError as err:
+        raise ValidationError({key: {index: err.messages}})
+
+
+def _apply_habits(user_id, items, deleted_ids):
+    ids = [item['id'] for item in items if 'id' in item] + deleted_ids
+    owned = {
+        habit.id: habit for habit in
+        Habit.query.filter(Habit.user_id == user_id, Habit.id.in_(ids))
+    }
+    results = []
+    for index, item in enumerate(items):
+        if 'id' in item:
+            habit = owned.get(item['id'])
+            if habit is None:
+                raise SyncNotFound(f"Habit {item['id']} not found")
+            _load_item(
+                'habits', index, habit_schema, item,
+                instance=habit, partial=True
+            )
+        else:
+            habit = _load_item('habits', index, habit_schema, item)
+            habit.user_id = user_id
+            db.session.add(habit)
+        results.append(habit)
+    for habit_id in deleted_ids:
+        if habit_id in owned:
+            db.session.delete(owned[habit_id])
+    return results
+
+
+def _apply_habit_logs(user_id, items, deleted_ids):
+    """回傳 (套用的紀錄, 重新計算統計的習慣)"""
+    ids = [item['id'] for item in items if 'id' in item] + deleted_ids
+    owned = {
+        log.id: log for log in _owned_habit_logs(user_id, ids)
+    } if ids else {}
+    habit_ids = {item['habit_id'] for item in items if 'habit_id' in item}
+    owned_habit_ids = {
+        habit_id for habit_id, in db.session.query(Habit.id).filter(
+            Habit.user_id == user_id, Habit.id.in_(habit_ids)
+        )
+    } if habit_ids else set()
+
+    results = []
+    touched_habit_ids = set()
+    for index, item in enumerate(items):
+        habit_id = item.get('habit_id')
+        if habit_id is not None and habit_id not in owned_habit_ids:
+            raise SyncNotFound(f"Habit {habit_id} not found")
+        if 'id' in item:
+            log = owned.get(item['id'])
+            if log is None:
+                raise SyncNotFound(f"Habit log {item['id']} not found")
+            touched_habit_ids.add(log.habit_id)
+            _load_item(
+                'habit_logs', index, habit_log_schema, item,
+                instance=log, partial=True
+            )
+        else:
+            log = _load_item('habit_logs', index, habit_log_schema, item)
+            db.session.add(log)
+        touched_habit_ids.add(log.habit_id)
+        results.append(log)
+    for log_id in deleted_ids:
+        if log_id in owned:
+            touched_habit_ids.add(owned[log_id].habit_id)
+            db.session.delete(owned[log_id])
+
+    db.session.flush()
+    return results, refresh_habit_stats(touched_habit_ids)
+
+
+def _apply_mood_logs(user_id, items, deleted_ids):
+    ids = [item['id'] for item in items if 'id' in item] + deleted_ids
+    owned = {
+        mood.id: mood for mood in MoodLog.query.filter(
+            MoodLog.user_id == user_id, MoodLog.id.in_(ids)
+        )
+    } if ids else {}
+
+    results = []
+    for index, item in enumerate(items):
+        if 'id' in item:
+            mood = owned.get(item['id'])
+            if mood is None:
+                raise SyncNotFound(f"Mood entry {item['id']} not found")
+            data = _load_item(
+                'mood_logs', index, mood_log_schema, item, partial=True
+            )
+            for key, value in data.items():
+                setattr(mood, key, value)
+        else:
+            data = _load_item('mood_logs', index, mood_log_schema, item)
+            mood = MoodLog(user_id=user_id, **data)
+            db.session.add(mood)
+        results.append(mood)
+    for mood_id in deleted_ids:
+        if mood_id in owned:
+            db.session.delete(owned[mood_id])
+    return results
+
+
+@sync_bp.route('', methods=['POST'])
+@api_doc(
+    body=sync_schema, returns=sync_schema, errors=(400, 404, 409, 422)
+)
+@jwt_required()
+def push_changes():
+    """在單一交易中套用用戶端的一批變更"""
+    user_id = int(get_jwt_identity())
+    json_data = request.get_json()
+    if not json_data:
+        return jsonify({"message": "No input data provided"}), 400
+    error = _envelope_error(json_data)
+    if error:
+        return jsonify({"message": error}), 400
+    deleted = json_data.get('deleted', {})
+
+    try:
+        habits = _apply_habits(
+            user_id, json_data.get('habits', []), deleted.get('habits', [])
+        )
+        habit_logs, refreshed = _apply_habit_logs(
+            user_id, json_data.get('habit_logs', []),
+            deleted.get('habit_logs', [])
+        )
+        # 統計隨紀錄改變的習慣也一併回傳
+        habits += [habit for habit in refreshed if habit not in habits]
+        mood_logs = _apply_mood_logs(
+            user_id, json_data.get('mood_logs', []),
+            deleted.get('mood_logs', [])
+        )
+        db.session.commit()
+    except ValidationError as err:
+        db.session.rollback()
+        return jsonify(err.messages), 422
+    except SyncNotFound as err:
+        db.session.rollback()
+        return jsonify({"message": str(err)}), 404
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({
+            "message": "A log for this date already exists."
+        }), 409
+
+    deleted = {key: deleted.get(key, []) for key in ENTITIES}
+    return jsonify(_sync_payload(
+        current_token(user_id), habits, habit_logs, mood_logs, deleted
+    )), 200
@@ -1,5 +1,8 @@
 # app/extensions.py
 
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
@@ -12,3 +15,29 @@ migrate = Migrate()
 cors = CORS(resources={r"/*": {"origins": "*"}})
 ma = Marshmallow()
 jwt = JWTManager()
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite 預設不檢查外鍵，需開啟才會執行 ON DELETE CASCADE。
+
+    同時改用 WAL 日誌，讓讀取不會被寫入阻擋 (記憶體資料庫會忽略此設定)。
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+def begin_write():
+    """在讀取-修改-寫入流程開始前取得寫入鎖。
+
+    SQLite 會忽略 SELECT ... FOR UPDATE，改以 BEGIN IMMEDIATE 讓並行的
+    寫入依序執行；其他資料庫不需要，由 with_for_update() 鎖定資料列。
+    """
+    connection = db.session.connection()
+    if connection.dialect.name != 'sqlite':
+        return
+    if not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
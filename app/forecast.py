@@ -0,0 +1,306 @@
+# app/forecast.py
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from .extensions import db
+from .models import ChangeLog, Habit, HabitLog, MoodLog
+from .sync import current_token
+
+ONE_DAY = timedelta(days=1)
+# 前一天的心情以量表中點為基準；沒有紀錄時視為中性 (0)
+NEUTRAL_RATING = 3.0
+RIDGE_LAMBDA = 1.0
+# 少於這麼多天的心情紀錄不提供預測
+MIN_SAMPLES = 7
+# 累積這麼多次增量更新後重新擬合，避免浮點誤差累積
+REFIT_AFTER_UPDATES = 1000
+
+
+class ForecastModel:
+    """單一使用者的 ridge 迴歸狀態。
+
+    特徵為 [截距, 各習慣當天是否完成..., 前一天心情 - 中點]，目標為當天的
+    心情評分。保存 (XᵀX + λI)⁻¹ 與 Xᵀy，新增或修改一列只需 O(p²) 的
+    Sherman–Morrison 秩一更新。
+    """
+
+    __slots__ = (
+        'habit_ids', 'columns', 'token', 'a_inv', 'b', 'coef',
+        'samples', 'updates',
+    )
+
+    def __init__(self, habit_ids, token, a_inv, b, samples):
+        self.habit_ids = tuple(habit_ids)
+        self.columns = {habit_id: i for i, habit_id in enumerate(habit_ids)}
+        self.token = token
+        self.a_inv = a_inv
+        self.b = b
+        self.coef = a_inv @ b
+        self.samples = samples
+        self.updates = 0
+
+    def row(self, done_habit_ids, previous_rating):
+        x = np.zeros(len(self.habit_ids) + 2)
+        x[0] = 1.0
+        for habit_id in done_habit_ids:
+            x[self.columns[habit_id] + 1] = 1.0
+        if previous_rating is not None:
+            x[-1] = previous_rating - NEUTRAL_RATING
+        return x
+
+    def rank_one(self, x, y, sign=1):
+        """加入 (sign=1) 或移除 (sign=-1) 一筆觀測值；失敗時回傳 False"""
+        u = self.a_inv @ x
+        denominator = 1.0 + sign * (x @ u)
+        if denominator <= 1e-9:
+            return False
+        self.a_inv -= sign * np.outer(u, u) / denominator
+        self.b += sign * y * x
+        self.coef = self.a_inv @ self.b
+        self.samples += sign
+        self.updates += 1
+        return True
+
+    def replace(self, old_x, new_x, y):
+        return self.rank_one(old_x, y, -1) and self.rank_one(new_x, y)
+
+    def predict(self, done_habit_ids, previous_rating):
+        value = self.row(done_habit_ids, previous_rating) @ self.coef
+        return float(np.clip(value, 1, 5))
+
+
+def design_matrix(days, ratings, habit_ids, habit_days):
+    """以向量化方式建立特徵矩陣。
+
+    days/ratings: 依日期遞增的心情紀錄 (日期為 ordinal)
+    habit_ids: 依 id 遞增的習慣；habit_days: (habit_id, 日期 ordinal) 陣列
+    """
+    n = len(days)
+    x = np.zeros((n, len(habit_ids) + 2))
+    x[:, 0] = 1.0
+    if n == 0:
+        return x
+
+    if len(habit_days):
+        rows = np.searchsorted(days, habit_days[:, 1])
+        found = rows < n
+        found[found] = days[rows[found]] == habit_days[found, 1]
+        columns = np.searchsorted(habit_ids, habit_days[found, 0]) + 1
+        x[rows[found], columns] = 1.0
+
+    previous = np.minimum(np.searchsorted(days, days - 1), n - 1)
+    has_previous = days[previous] == days - 1
+    x[:, -1] = np.where(
+        has_previous, ratings[previous] - NEUTRAL_RATING, 0.0
+    )
+    return x
+
+
+def fit(x, y, habit_ids, token, lam=RIDGE_LAMBDA):
+    """以正規方程式擬合 ridge 迴歸；截距不做正規化"""
+    penalty = np.full(x.shape[1], lam)
+    penalty[0] = 0.0
+    a_inv = np.linalg.inv(x.T @ x + np.diag(penalty))
+    return ForecastModel(habit_ids, token, a_inv, x.T @ y, len(y))
+
+
+def _load_model(user_id, habit_ids):
+    """擬合使用者的模型；心情紀錄少於 MIN_SAMPLES 筆時回傳 None"""
+    token = current_token(user_id)
+    moods = db.session.execute(
+        select(MoodLog.log_date, MoodLog.rating).where(
+            MoodLog.user_id == user_id
+        ).order_by(MoodLog.log_date)
+    ).all()
+    # 沒有任何紀錄時截距那一欄全為 0，矩陣不可逆
+    if len(moods) < MIN_SAMPLES:
+        return None
+    habit_logs = db.session.execute(
+        select(HabitLog.habit_id, HabitLog.log_date).join(Habit).where(
+            Habit.user_id == user_id
+        )
+    ).all()
+
+    days = np.array([day.toordinal() for day, _ in moods], dtype=np.int64)
+    ratings = np.array([rating for _, rating in moods], dtype=float)
+    habit_days = np.array(
+        [(habit_id, day.toordinal()) for habit_id, day in habit_logs],
+        dtype=np.int64
+    ).reshape(-1, 2)
+    x = design_matrix(
+        days, ratings, np.array(habit_ids, dtype=np.int64), habit_days
+    )
+    return fit(x, ratings, habit_ids, token)
+
+
+def _ratings(user_id, dates):
+    return dict(db.session.execute(
+        select(MoodLog.log_date, MoodLog.rating).where(
+            MoodLog.user_id == user_id, MoodLog.log_date.in_(dates)
+        )
+    ).all())
+
+
+def _done_habits(user_id, log_date):
+    return db.session.execute(
+        select(HabitLog.habit_id).join(Habit).where(
+            Habit.user_id == user_id, HabitLog.log_date == log_date
+        )
+    ).scalars().all()
+
+
+class ForecastCache:
+    """以 LRU 快取各使用者擬合後的模型。
+
+    模型記錄擬合時的同步 token；讀取時 token 不同 (其他行程或其他端點
+    修改了資料) 就重新擬合。create_mood 與 track_habit 寫入後呼叫
+    observe_*，以秩一更新讓快取的模型保持有效而不需重新擬合。
+    """
+
+    def __init__(self, max_users=1024):
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._models = OrderedDict()
+
+    def init_app(self, app):
+        with self._lock:
+            self._models.clear()
+        app.extensions['forecast_cache'] = self
+
+    def get(self, user_id, habit_ids):
+        """回傳使用者的最新模型，必要時重新擬合；資料不足時回傳 None"""
+        habit_ids = tuple(habit_ids)
+        token = current_token(user_id)
+        with self._lock:
+            model = self._models.get(user_id)
+            if model is not None:
+                self._models.move_to_end(user_id)
+        if (
+            model is None or model.token != token
+            or model.habit_ids != habit_ids
+            or model.updates >= REFIT_AFTER_UPDATES
+        ):
+            model = _load_model(user_id, habit_ids)
+            if model is None:
+                self.invalidate(user_id)
+                return None
+            self._store(user_id, model)
+        return model
+
+    def _store(self, user_id, model):
+        with self._lock:
+            self._models[user_id] = model
+            self._models.move_to_end(user_id)
+            while len(self._models) > self.max_users:
+                self._models.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._models.pop(user_id, None)
+
+    def _pending_changes(self, user_id, model):
+        return db.session.execute(
+            select(
+                ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id,
+                ChangeLog.deleted
+            ).where(ChangeLog.user_id == user_id, ChangeLog.id > model.token)
+        ).all()
+
+    def _observe(self, user_id, expected, prepare):
+        """確認快取之後的變更只有 expected 這幾筆，才套用 prepare() 回傳的更新"""
+        with self._lock:
+            model = self._models.get(user_id)
+        # 沒有快取的模型時不需要任何查詢，下次讀取時才擬合
+        if model is None:
+            return
+        changes = self._pending_changes(user_id, model)
+        if any(
+            deleted or (entity, entity_id) not in expected
+            for _, entity, entity_id, deleted in changes
+        ):
+            self.invalidate(user_id)
+            return
+        update = prepare()
+        with self._lock:
+            if self._models.get(user_id) is not model:
+                return
+            if not update(model):
+                self._models.pop(user_id, None)
+                return
+            model.token = max(
+                (change_id for change_id, *_ in changes), default=model.token
+            )
+
+    def observe_mood(self, user_id, mood):
+        """新增一筆心情紀錄後更新快取的模型"""
+        day = mood.log_date
+
+        def prepare():
+            ratings = _ratings(user_id, [day - ONE_DAY, day + ONE_DAY])
+            done = _done_habits(user_id, day)
+            following = ratings.get(day + ONE_DAY)
+            following_done = (
+                _done_habits(user_id, day + ONE_DAY)
+                if following is not None else []
+            )
+
+            def update(model):
+                if any(
+                    habit_id not in model.columns
+                    for habit_id in done + following_done
+                ):
+                    return False
+                if not model.rank_one(
+                    model.row(done, ratings.get(day - ONE_DAY)), mood.rating
+                ):
+                    return False
+                # 隔天的紀錄原本沒有前一天的心情，需一併更新
+                if following is not None:
+                    return model.replace(
+                        model.row(following_done, None),
+                        model.row(following_done, mood.rating),
+                        following
+                    )
+                return True
+            return update
+
+        self._observe(user_id, {('mood_logs', mood.id)}, prepare)
+
+    def observe_completion(self, user_id, log):
+        """新增一筆打卡紀錄後更新快取的模型"""
+        day = log.log_date
+
+        def prepare():
+            ratings = _ratings(user_id, [day - ONE_DAY, day])
+            rating = ratings.get(day)
+            done = _done_habits(user_id, day) if rating is not None else []
+
+            def update(model):
+                # 當天沒有心情紀錄時不影響模型
+                if rating is None:
+                    return True
+                if any(habit_id not in model.columns for habit_id in done):
+                    return False
+                previous = ratings.get(day - ONE_DAY)
+                before = [
+                    habit_id for habit_id in done if habit_id != log.habit_id
+                ]
+                return model.replace(
+                    model.row(before, previous), model.row(done, previous),
+                    rating
+                )
+            return update
+
+        self._observe(
+            user_id,
+            {('habit_logs', log.id), ('habits', log.habit_id)},
+            prepare
+        )
+
+
+forecast_cache = ForecastCache()
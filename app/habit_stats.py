@@ -0,0 +1,107 @@
+# app/habit_stats.py
+
+from datetime import timedelta
+from itertools import groupby
+from operator import attrgetter, itemgetter
+from sqlalchemy import update
+
+from .extensions import db
+from .models import Habit, HabitLog
+
+ONE_DAY = timedelta(days=1)
+EMPTY_STATS = (0, None, 0)
+
+
+def record_completion(habit, log_date):
+    """新增一筆打卡紀錄後更新習慣的完成統計。
+
+    一般情況 (打卡日期為最新) 只需常數時間的更新；補登過去的日期可能接起
+    兩段連續紀錄，此時改為重新計算。呼叫端需已將新紀錄加入 session。
+    """
+    # 以 SQL 運算式累加，避免並行寫入時遺失更新
+    habit.total_completions = Habit.total_completions + 1
+    last = habit.last_log_date
+    if last is None or log_date > last:
+        habit.current_streak = (
+            habit.current_streak + 1 if last == log_date - ONE_DAY else 1
+        )
+        habit.last_log_date = log_date
+    elif log_date < last:
+        db.session.flush()
+        refresh_habit_stats([habit.id])
+
+
+def compute_habit_stats(rows):
+    """由依 (habit_id, log_date DESC) 排序的 (habit_id, log_date) 計算統計。
+
+    回傳 {habit_id: (total_completions, last_log_date, current_streak)}。
+    """
+    stats = {}
+    for habit_id, group in groupby(rows, key=itemgetter(0)):
+        dates = (log_date for _, log_date in group)
+        last = previous = next(dates)
+        total = streak = 1
+        in_streak = True
+        for log_date in dates:
+            total += 1
+            in_streak = in_streak and previous - log_date == ONE_DAY
+            streak += in_streak
+            previous = log_date
+        stats[habit_id] = (total, last, streak)
+    return stats
+
+
+def _stats_query(habit_ids=None):
+    query = db.session.query(HabitLog.habit_id, HabitLog.log_date)
+    if habit_ids is not None:
+        query = query.filter(HabitLog.habit_id.in_(habit_ids))
+    return query.order_by(HabitLog.habit_id, HabitLog.log_date.desc())
+
+
+def _stats_row(habit_id, stats):
+    total, last, streak = stats
+    return {
+        'id': habit_id,
+        'total_completions': total,
+        'last_log_date': last,
+        'current_streak': streak,
+    }
+
+
+def refresh_habit_stats(habit_ids):
+    """以單一查詢重新計算指定習慣的統計，回傳更新後的習慣。
+
+    統計寫回 session 中的物件而非批次 UPDATE，統計有變動的習慣才會在 flush
+    時留下變更紀錄，讓用戶端同步到新的數值。
+    """
+    habit_ids = set(habit_ids)
+    if not habit_ids:
+        return []
+    stats = compute_habit_stats(_stats_query(habit_ids))
+    habits = Habit.query.filter(Habit.id.in_(habit_ids)).all()
+    for habit in habits:
+        (habit.total_completions, habit.last_log_date,
+         habit.current_streak) = stats.get(habit.id, EMPTY_STATS)
+    return sorted(habits, key=attrgetter('id'))
+
+
+def reconcile_habit_stats(batch_size=1000):
+    """修正所有與 habit_logs 不一致的統計，回傳修正的習慣數量"""
+    stats = compute_habit_stats(
+        _stats_query().yield_per(batch_size)
+    )
+    drifted = []
+    current = db.session.query(
+        Habit.id, Habit.total_completions,
+        Habit.last_log_date, Habit.current_streak
+    ).yield_per(batch_size)
+    for habit_id, total, last, streak in current:
+        expected = stats.get(habit_id, EMPTY_STATS)
+        if (total, last, streak) != expected:
+            drifted.append(_stats_row(habit_id, expected))
+    for start in range(0, len(drifted), batch_size):
+        db.session.execute(
+            update(Habit), drifted[start:start + batch_size]
+        )
+    db.session.commit()
+    return len(drifted)
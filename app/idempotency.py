@@ -0,0 +1,126 @@
+# app/idempotency.py
+
+import hashlib
+from datetime import datetime, timedelta, UTC
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+DEFAULT_TTL = timedelta(hours=24)
+
+
+def _utcnow():
+    # DateTime 欄位不含時區，一律以 naive UTC 比較
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _request_hash():
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+def _replay(record):
+    response = make_response(record.response_body or '', record.status_code)
+    response.mimetype = 'application/json'
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    """支援 Idempotency-Key 標頭：重試時直接回傳第一次的回應而不重新執行。
+
+    需放在 jwt_required() 之後，key 的範圍為單一使用者。
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(*args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"message": f"{HEADER} is too long"}), 400
+
+        user_id = int(get_jwt_identity())
+        request_hash = _request_hash()
+        record = IdempotencyKey.query.filter_by(
+            user_id=user_id, key=key
+        ).first()
+        if record and record.expires_at <= _utcnow():
+            db.session.delete(record)
+            db.session.flush()
+            record = None
+
+        if record:
+            if record.request_hash != request_hash:
+                return jsonify({
+                    "message": f"{HEADER} was already used for a "
+                               "different request"
+                }), 422
+            if record.status_code is None:
+                return jsonify({
+                    "message": "A request with this Idempotency-Key is "
+                               "still being processed"
+                }), 409
+            return _replay(record)
+
+        # 先保留 key，讓並行的重試請求在唯一約束上失敗而不會重複執行
+        ttl = current_app.config.get('IDEMPOTENCY_TTL', DEFAULT_TTL)
+        record = IdempotencyKey(
+            user_id=user_id, key=key, request_hash=request_hash,
+            expires_at=_utcnow() + ttl
+        )
+        db.session.add(record)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({
+                "message": "A request with this Idempotency-Key is "
+                           "still being processed"
+            }), 409
+        record_id = record.id
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            db.session.rollback()
+            _release(record_id)
+            raise
+
+        if response.status_code >= 500:
+            # 伺服器錯誤不保存，讓用戶端可以重試
+            _release(record_id)
+        else:
+            record = db.session.get(IdempotencyKey, record_id)
+            record.status_code = response.status_code
+            record.response_body = response.get_data(as_text=True)
+            db.session.commit()
+        return response
+
+    # 讓 OpenAPI 規格記載 Idempotency-Key 標頭
+    wrapper.idempotent = True
+    return wrapper
+
+
+def _release(record_id):
+    db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.id == record_id)
+    )
+    db.session.commit()
+
+
+def purge_expired_keys():
+    """刪除已過期的 Idempotency-Key，回傳刪除的數量"""
+    result = db.session.execute(
+        delete(IdempotencyKey).where(IdempotencyKey.expires_at <= _utcnow())
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,219 @@
+# app/jobs.py
+
+import atexit
+import hashlib
+import itertools
+import json
+import queue
+import threading
+from datetime import datetime, timedelta, UTC
+
+from marshmallow import Schema
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import Job, Habit, HabitLog, MoodLog
+
+# 已註冊的工作類型: kind -> handler(user_id, **params)
+JOB_HANDLERS = {}
+# kind -> 驗證 params 的 schema；提交時驗證，避免錯誤到執行時才出現
+JOB_PARAMS_SCHEMAS = {}
+
+
+def job_handler(kind, params_schema=None):
+    """將函式註冊為指定類型的背景工作；未指定 schema 表示不接受任何參數"""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        JOB_PARAMS_SCHEMAS[kind] = params_schema or Schema()
+        return func
+    return decorator
+
+
+def make_dedup_key(kind, params):
+    payload = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class JobQueue:
+    """行程內的背景工作佇列。
+
+    工作會先寫入 `jobs` 表格，再交由固定數量的工作執行緒依優先權執行，
+    因此不需要外部 broker，且請求處理執行緒不會被長時間的運算阻塞。
+    """
+
+    # 排在所有工作之前，shutdown 後工作執行緒不會先把佇列中的工作做完
+    _STOP = (float('-inf'), 0, None)
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._threads = []
+        self._started = False
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self._queue = queue.PriorityQueue()
+        self._started = False
+        app.config.setdefault('JOBS_MAX_WORKERS', 2)
+        app.config.setdefault('JOBS_RUN_INLINE', False)
+        app.config.setdefault('JOBS_STALE_AFTER', timedelta(hours=1))
+        app.extensions['job_queue'] = self
+        app.before_request(self._start_on_first_request)
+
+    def _start_on_first_request(self):
+        # 在處理請求的行程中 (fork 之後) 才啟動執行緒並接手前次留下的工作，
+        # 不需等到有新的工作提交
+        if not self._started and not self.app.config['JOBS_RUN_INLINE']:
+            self._start_workers()
+
+    def submit(self, user_id, kind, params=None, priority=0):
+        """建立工作；若已有相同的待處理工作則直接回傳該工作。
+
+        回傳 (job, created)。
+        """
+        if kind not in JOB_HANDLERS:
+            raise KeyError(kind)
+        params = params or {}
+        dedup_key = make_dedup_key(kind, params)
+
+        existing = self._active_job(user_id, dedup_key)
+        if existing:
+            return existing, False
+
+        job = Job(
+            user_id=user_id,
+            kind=kind,
+            params=params,
+            dedup_key=dedup_key,
+            priority=priority,
+        )
+        db.session.add(job)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # 並行的相同提交已先建立工作 (uq_jobs_user_dedup_active)
+            db.session.rollback()
+            existing = self._active_job(user_id, dedup_key)
+            if existing is None:
+                raise
+            return existing, False
+
+        if self.app.config['JOBS_RUN_INLINE']:
+            self._run(job.id)
+            db.session.refresh(job)
+        else:
+            self._start_workers()
+            self._enqueue(job.id, priority)
+        return job, True
+
+    @staticmethod
+    def _active_job(user_id, dedup_key):
+        return Job.query.filter(
+            Job.user_id == user_id,
+            Job.dedup_key == dedup_key,
+            Job.status.in_(('pending', 'running')),
+        ).first()
+
+    def shutdown(self, wait=True):
+        """停止工作執行緒；尚未執行的工作保留在資料庫中供下次啟動時接手"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(self._STOP)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _enqueue(self, job_id, priority):
+        # PriorityQueue 取最小值，因此以負的優先權排序；計數器確保同優先權時先進先出
+        self._queue.put((-priority, next(self._counter), job_id))
+
+    def _start_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._started = True
+            # 先排入前次留下的工作，執行緒啟動後才會依優先權取出
+            self._recover_pending()
+            for i in range(self.app.config['JOBS_MAX_WORKERS']):
+                thread = threading.Thread(
+                    target=self._worker, name=f'job-worker-{i}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            atexit.register(self.shutdown)
+
+    def _recover_pending(self):
+        # 前一個行程中斷時尚未完成的工作重新排入佇列
+        stale_before = datetime.now(UTC) - self.app.config['JOBS_STALE_AFTER']
+        Job.query.filter(
+            Job.status == 'running', Job.started_at < stale_before
+        ).update({'status': 'pending'})
+        db.session.commit()
+        pending = db.session.query(Job.id, Job.priority).filter_by(
+            status='pending'
+        )
+        for job_id, priority in pending:
+            self._enqueue(job_id, priority)
+
+    def _worker(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            if job_id is None:
+                break
+            with self.app.app_context():
+                self._run(job_id)
+
+    def _run(self, job_id):
+        # 以條件式更新搶佔工作，避免同一工作被重複執行
+        claimed = Job.query.filter_by(id=job_id, status='pending').update({
+            'status': 'running', 'started_at': datetime.now(UTC)
+        })
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(Job, job_id)
+        try:
+            job.result = JOB_HANDLERS[job.kind](job.user_id, **job.params)
+            job.status = 'succeeded'
+        except Exception as e:
+            db.session.rollback()
+            job = db.session.get(Job, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.now(UTC)
+        db.session.commit()
+
+
+job_queue = JobQueue()
+
+
+@job_handler('export')
+def export_user_data(user_id):
+    """匯出使用者的所有習慣、習慣紀錄與心情紀錄"""
+    habits = Habit.query.filter_by(user_id=user_id).all()
+    habit_logs = HabitLog.query.join(Habit).filter(
+        Habit.user_id == user_id
+    ).all()
+    moods = MoodLog.query.filter_by(user_id=user_id).all()
+    return {
+        "habits": [
+            {"id": h.id, "name": h.name, "frequency": h.frequency}
+            for h in habits
+        ],
+        "habit_logs": [
+            {"habit_id": log.habit_id, "log_date": log.log_date.isoformat(),
+             "value": log.value}
+            for log in habit_logs
+        ],
+        "moods": [
+            {"log_date": m.log_date.isoformat(), "rating": m.rating,
+             "notes": m.notes}
+            for m in moods
+        ],
+    }
@@ -2,6 +2,21 @@
 
 from .extensions import db
 from datetime import datetime, UTC
+from zoneinfo import ZoneInfo
+
+DEFAULT_TIMEZONE = 'UTC'
+
+
+def utcnow():
+    """欄位預設值需為可呼叫物件，才會在每次寫入時取得當下時間"""
+    return datetime.now(UTC)
+
+
+def to_local_date(moment, timezone):
+    """將 UTC 時間換算為指定時區的日期 (無時區資訊的時間視為 UTC)"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=UTC)
+    return moment.astimezone(ZoneInfo(timezone)).date()
 
 
 class User(db.Model):
@@ -13,14 +28,22 @@ class User(db.Model):
     )
     password_hash = db.Column(db.String(256), nullable=False)
     created_at = db.Column(
-        db.DateTime, nullable=False, default=datetime.now(UTC)
+        db.DateTime, nullable=False, default=utcnow
+    )
+    # IANA 時區名稱，例如 "Asia/Taipei"；決定紀錄寫入時的本地日期
+    timezone = db.Column(
+        db.String(64), nullable=False, default=DEFAULT_TIMEZONE,
+        server_default=DEFAULT_TIMEZONE
     )
 
+    # 子資料由資料庫的 ON DELETE CASCADE 刪除，ORM 不需逐筆載入
     habits = db.relationship(
-        'Habit', backref='user', lazy=True, cascade="all, delete-orphan"
+        'Habit', backref='user', lazy=True, cascade="all, delete-orphan",
+        passive_deletes=True
     )
     mood_logs = db.relationship(
-        'MoodLog', backref='user', lazy=True, cascade="all, delete-orphan"
+        'MoodLog', backref='user', lazy=True, cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 
@@ -28,7 +51,8 @@ class Habit(db.Model):
     __tablename__ = 'habits'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
-        db.Integer, db.ForeignKey('users.id'), nullable=False
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False, index=True
     )
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -38,11 +62,17 @@ class Habit(db.Model):
     start_date = db.Column(db.Date, nullable=True)
     end_date = db.Column(db.Date, nullable=True)
     created_at = db.Column(
-        db.DateTime, nullable=False, default=datetime.now(UTC)
+        db.DateTime, nullable=False, default=utcnow
     )
+    # 反正規化的完成統計，於寫入 habit_logs 時同步維護
+    total_completions = db.Column(db.Integer, nullable=False, default=0)
+    last_log_date = db.Column(db.Date, nullable=True)
+    # 截至 last_log_date 為止連續完成的天數
+    current_streak = db.Column(db.Integer, nullable=False, default=0)
 
     logs = db.relationship(
-        'HabitLog', backref='habit', lazy=True, cascade="all, delete-orphan"
+        'HabitLog', backref='habit', lazy=True, cascade="all, delete-orphan",
+        passive_deletes=True
     )
 
 
@@ -50,16 +80,18 @@ class HabitLog(db.Model):
     __tablename__ = 'habit_logs'
     id = db.Column(db.Integer, primary_key=True)
     habit_id = db.Column(
-        db.Integer, db.ForeignKey('habits.id'), nullable=False
+        db.Integer, db.ForeignKey('habits.id', ondelete='CASCADE'),
+        nullable=False
     )
     log_date = db.Column(db.Date, nullable=False)
     value = db.Column(
         db.Integer, nullable=False, default=1
     )  # 1 for done
     created_at = db.Column(
-        db.DateTime, nullable=False, default=datetime.now(UTC)
+        db.DateTime, nullable=False, default=utcnow
     )
 
+    # log_date 是使用者日曆上的日期 (不含時間)，區間查詢走唯一約束的索引
     __table_args__ = (
         db.UniqueConstraint(
             'habit_id', 'log_date', name='_habit_log_date_uc'
@@ -71,15 +103,133 @@ class MoodLog(db.Model):
     __tablename__ = 'mood_logs'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(
-        db.Integer, db.ForeignKey('users.id'), nullable=False
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
     )
     rating = db.Column(db.Integer, nullable=False)  # 1-5
     notes = db.Column(db.Text, nullable=True)
     log_date = db.Column(db.Date, nullable=False)
     created_at = db.Column(
-        db.DateTime, nullable=False, default=datetime.now(UTC)
+        db.DateTime, nullable=False, default=utcnow
     )
 
     __table_args__ = (
         db.UniqueConstraint('user_id', 'log_date', name='_user_log_date_uc'),
+        # 涵蓋索引：區間彙總 (summary) 只需讀取索引即可完成
+        db.Index(
+            'ix_mood_logs_user_log_date_rating',
+            'user_id', 'log_date', 'rating'
+        ),
+    )
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    # kind + params 的雜湊，用於合併相同的待處理工作
+    dedup_key = db.Column(db.String(64), nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(
+        db.String(20), nullable=False, default='pending'
+    )  # pending, running, succeeded, failed
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(
+        db.DateTime, nullable=False, default=utcnow
+    )
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # 同一使用者相同的待處理工作只能有一筆，並行提交時由資料庫擋下
+        db.Index(
+            'uq_jobs_user_dedup_active', 'user_id', 'dedup_key', unique=True,
+            sqlite_where=db.text("status IN ('pending', 'running')"),
+            postgresql_where=db.text("status IN ('pending', 'running')"),
+        ),
+        db.Index('ix_jobs_status_priority', 'status', 'priority'),
+    )
+
+
+class ChangeLog(db.Model):
+    """同步用的變更紀錄；每個實體只保留最新一筆，id 即為同步 token"""
+    __tablename__ = 'change_logs'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    entity = db.Column(
+        db.String(20), nullable=False
+    )  # habits, habit_logs, mood_logs
+    entity_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'entity', 'entity_id', name='_change_log_entity_uc'
+        ),
+        db.Index('ix_change_logs_user_id_id', 'user_id', 'id'),
+        # SQLite 預設會重用最大的 rowid，需 AUTOINCREMENT 才能保證 token 遞增
+        {'sqlite_autoincrement': True},
+    )
+
+
+class CohortStat(db.Model):
+    """跨使用者的匿名彙總結果，不含任何 user_id"""
+    __tablename__ = 'cohort_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    metric = db.Column(
+        db.String(50), nullable=False
+    )  # mood_by_weekday, habit_mood_correlation
+    key = db.Column(db.String(100), nullable=False)
+    users = db.Column(db.Integer, nullable=False)
+    samples = db.Column(db.Integer, nullable=False)
+    mean = db.Column(db.Float, nullable=False)
+    stddev = db.Column(db.Float, nullable=False)
+    computed_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'metric', 'key', name='_cohort_stat_metric_key_uc'
+        ),
+    )
+
+
+class IdempotencyKey(db.Model):
+    """寫入端點的 Idempotency-Key 與其第一次執行的回應"""
+    __tablename__ = 'idempotency_keys'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
+    )
+    key = db.Column(db.String(255), nullable=False)
+    # 方法 + 路徑 + 請求內容的雜湊，用於偵測同一個 key 被用在不同請求上
+    request_hash = db.Column(db.String(64), nullable=False)
+    # 為 NULL 表示第一次請求仍在處理中
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.Text, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'key', name='_user_idempotency_key_uc'),
+    )
+
+
+class RevokedToken(db.Model):
+    """已撤銷 (登出) 的 JWT；過期後即可刪除"""
+    __tablename__ = 'revoked_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=False, unique=True)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        nullable=False
     )
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
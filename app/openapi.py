@@ -0,0 +1,194 @@
+# app/openapi.py
+
+import gzip
+import hashlib
+import inspect
+import re
+from http import HTTPStatus
+
+from apispec import APISpec
+from apispec.ext.marshmallow import MarshmallowPlugin, resolver
+from flask import Response, request
+
+from .schemas import ErrorSchema
+
+API_PREFIX = '/api/v1'
+SPEC_INFO = {
+    'title': 'MindTrack API',
+    'version': '1.0.0',
+    'description': (
+        '一個旨在幫助使用者追蹤好習慣、記錄每日心情，'
+        '並透過視覺化洞察揭示行為與感受之間關聯的 Web 應用程式。'
+    ),
+}
+# 規格只會隨部署改變，ETag 讓快取過期後只需一次 304 重新驗證
+CACHE_MAX_AGE = 24 * 60 * 60
+
+# <int:habit_id> -> (int, habit_id)
+_RULE_ARGUMENT = re.compile(r'<(?:(\w+)(?:\([^)]*\))?:)?(\w+)>')
+_PARAMETER_TYPES = {'int': 'integer', 'float': 'number'}
+error_schema = ErrorSchema()
+IDEMPOTENCY_KEY_PARAMETER = {
+    'in': 'header',
+    'name': 'Idempotency-Key',
+    'required': False,
+    'schema': {'type': 'string', 'maxLength': 255},
+    'description': '重試時回傳第一次的回應而不重新執行',
+}
+
+
+def api_doc(body=None, returns=None, status=200, public=False, query=None,
+            errors=()):
+    """標記端點的請求與回應 schema。
+
+    傳入的應為處理函式驗證與序列化時使用的同一個 schema 實例，
+    文件因此不會與實際行為脫節。public=True 表示不需要 JWT。
+    status 可為多個成功狀態碼的 tuple (第一個為主要結果)，query 為查詢參數的
+    schema，errors 為可能回傳的 4xx 狀態碼。
+    """
+    def decorator(view):
+        view.api_doc = {
+            'body': body,
+            'returns': returns,
+            'status': status,
+            'public': public,
+            'query': query,
+            'errors': errors,
+        }
+        return view
+    return decorator
+
+
+def _error_response(status):
+    return {
+        'description': HTTPStatus(status).phrase,
+        'content': {'application/json': {'schema': error_schema}},
+    }
+
+
+def _schema_name(schema):
+    # 以 only 裁切或 partial 的 schema 直接內嵌，避免與完整版本搶同一個元件名稱
+    if getattr(schema, 'only', None) or getattr(schema, 'partial', False):
+        return None
+    return resolver(schema)
+
+
+def _parameters(rule):
+    return [
+        {
+            'in': 'path',
+            'name': name,
+            'required': True,
+            'schema': {'type': _PARAMETER_TYPES.get(converter, 'string')},
+        }
+        for converter, name in _RULE_ARGUMENT.findall(rule.rule)
+    ]
+
+
+def _operation(rule, view):
+    doc = getattr(view, 'api_doc', {})
+    blueprint = rule.endpoint.split('.')[0]
+    operation = {
+        'tags': [blueprint.removesuffix('_bp')],
+        'summary': (inspect.getdoc(view) or '').split('\n')[0],
+        'operationId': rule.endpoint.split('.')[-1],
+    }
+    parameters = _parameters(rule)
+    if doc.get('query') is not None:
+        # MarshmallowPlugin 會將 schema 的每個欄位展開為一個查詢參數
+        parameters.append({'in': 'query', 'schema': doc['query']})
+    # idempotent 裝飾器標記的屬性會經由 functools.wraps 傳到外層
+    idempotent = getattr(view, 'idempotent', False)
+    if idempotent:
+        parameters.append(IDEMPOTENCY_KEY_PARAMETER)
+    if parameters:
+        operation['parameters'] = parameters
+    if doc.get('body') is not None:
+        operation['requestBody'] = {
+            'required': True,
+            'content': {'application/json': {'schema': doc['body']}},
+        }
+
+    statuses = doc.get('status', 200)
+    if isinstance(statuses, int):
+        statuses = (statuses,)
+    responses = {}
+    for status in statuses:
+        response = {'description': HTTPStatus(status).phrase}
+        if doc.get('returns') is not None:
+            response['content'] = {
+                'application/json': {'schema': doc['returns']}
+            }
+        responses[status] = response
+    errors = set(doc.get('errors', ()))
+    if idempotent:
+        # key 過長 (400)、第一次請求仍在處理中 (409) 或用於不同請求 (422)
+        errors |= {400, 409, 422}
+    for error in sorted(errors):
+        responses[error] = _error_response(error)
+    if not doc.get('public'):
+        operation['security'] = [{'BearerAuth': []}]
+        responses[401] = {
+            'description': 'Missing, invalid or revoked token'
+        }
+    operation['responses'] = responses
+    return operation
+
+
+def build_spec(app):
+    """由已註冊的路由與 Marshmallow schema 產生 OpenAPI 規格"""
+    spec = APISpec(
+        title=SPEC_INFO['title'],
+        version=SPEC_INFO['version'],
+        openapi_version='3.0.3',
+        info={'description': SPEC_INFO['description']},
+        plugins=[MarshmallowPlugin(schema_name_resolver=_schema_name)],
+    )
+    spec.components.security_scheme('BearerAuth', {
+        'type': 'http', 'scheme': 'bearer', 'bearerFormat': 'JWT'
+    })
+
+    paths = {}
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if not rule.rule.startswith(API_PREFIX):
+            continue
+        view = app.view_functions[rule.endpoint]
+        path = _RULE_ARGUMENT.sub(r'{\2}', rule.rule)
+        for method in sorted(rule.methods - {'HEAD', 'OPTIONS'}):
+            paths.setdefault(path, {})[method.lower()] = _operation(
+                rule, view
+            )
+    for path, operations in paths.items():
+        spec.path(path=path, operations=operations)
+    return spec
+
+
+def _cached_spec(app):
+    # 第一次請求時才產生；並行的第一次請求可能各自產生，但結果相同
+    cached = app.extensions.get('openapi')
+    if cached is None:
+        body = build_spec(app).to_yaml({'allow_unicode': True}).encode(
+            'utf-8'
+        )
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        cached = app.extensions['openapi'] = {
+            'identity': (body, etag),
+            'gzip': (gzip.compress(body, mtime=0), f'{etag}-gzip'),
+        }
+    return cached
+
+
+def openapi_response(app):
+    """回傳快取的規格；支援 gzip 與 If-None-Match"""
+    cached = _cached_spec(app)
+    encoding = 'gzip' if request.accept_encodings['gzip'] else 'identity'
+    body, etag = cached[encoding]
+
+    response = Response(body, mimetype='application/yaml')
+    if encoding == 'gzip':
+        response.content_encoding = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CACHE_MAX_AGE
+    return response.make_conditional(request)
@@ -0,0 +1,24 @@
+# app/readonly.py
+
+from sqlalchemy import select
+
+from .extensions import db
+
+
+def dump_columns(schema, model):
+    """schema 會輸出的欄位所對應的資料表欄位"""
+    table = model.__table__
+    return [
+        table.c[field.attribute or name]
+        for name, field in schema.dump_fields.items()
+    ]
+
+
+def select_rows(schema, model, *criteria):
+    """以 Core select 讀取唯讀資料，回傳可直接交給 schema.dump 的 RowMapping。
+
+    只選取 schema 會輸出的欄位，不建立 ORM 實例，也不進入 session 的
+    identity map；適用於讀取後立即序列化、不會修改的 GET 端點。
+    """
+    statement = select(*dump_columns(schema, model)).where(*criteria)
+    return db.session.execute(statement).mappings()
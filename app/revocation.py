@@ -0,0 +1,101 @@
+# app/revocation.py
+
+import heapq
+import threading
+import time
+from datetime import datetime, UTC
+
+from sqlalchemy import delete
+
+from .extensions import db, jwt
+from .models import RevokedToken
+
+# 沒有 exp 的 token 永遠不會過期，撤銷紀錄保留到此時間
+NEVER_EXPIRES = datetime(9999, 12, 31)
+# 增量讀取時往回多讀的 id 數量；並行交易可能以不同於 id 的順序提交
+REFRESH_OVERLAP = 100
+
+
+def _utcnow():
+    # DateTime 欄位不含時區，一律以 naive UTC 比較
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class TokenDenylist:
+    """以記憶體保存已撤銷 JWT 的 denylist。
+
+    未撤銷的請求只需一次 dict 查詢，不會存取資料庫。每個行程每隔
+    REVOCATION_REFRESH_INTERVAL 秒才以 id 增量讀取其他行程新增的撤銷紀錄，
+    並依到期時間 (min-heap) 自動淘汰已過期的項目。
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def _reset(self):
+        self._expires = {}  # jti -> exp (UNIX timestamp)
+        self._heap = []  # (exp, jti)
+        self._last_id = 0
+        self._next_refresh = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self._reset()
+        app.config.setdefault('REVOCATION_REFRESH_INTERVAL', 5)
+        app.extensions['token_denylist'] = self
+        jwt.token_in_blocklist_loader(self.is_revoked)
+
+    def is_revoked(self, jwt_header, jwt_payload):
+        now = time.time()
+        if now >= self._next_refresh:
+            self._refresh(now)
+        return jwt_payload['jti'] in self._expires
+
+    def revoke(self, jwt_payload, user_id):
+        """撤銷 token 並清除資料庫中已過期的撤銷紀錄"""
+        exp = jwt_payload.get('exp')
+        expires_at = (
+            datetime.fromtimestamp(exp, UTC).replace(tzinfo=None)
+            if exp else NEVER_EXPIRES
+        )
+        db.session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= _utcnow())
+        )
+        db.session.add(RevokedToken(
+            jti=jwt_payload['jti'], user_id=user_id, expires_at=expires_at
+        ))
+        db.session.commit()
+        with self._lock:
+            self._add(jwt_payload['jti'], exp or float('inf'))
+
+    def _add(self, jti, exp):
+        if jti not in self._expires:
+            self._expires[jti] = exp
+            heapq.heappush(self._heap, (exp, jti))
+
+    def _refresh(self, now):
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            rows = db.session.query(
+                RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at
+            ).filter(
+                RevokedToken.id > self._last_id - REFRESH_OVERLAP,
+                RevokedToken.expires_at > _utcnow(),
+            ).order_by(RevokedToken.id).all()
+            for row_id, jti, expires_at in rows:
+                self._add(jti, expires_at.replace(tzinfo=UTC).timestamp())
+                self._last_id = max(self._last_id, row_id)
+            while self._heap and self._heap[0][0] <= now:
+                _, jti = heapq.heappop(self._heap)
+                del self._expires[jti]
+            self._next_refresh = (
+                now + self.app.config['REVOCATION_REFRESH_INTERVAL']
+            )
+
+
+token_denylist = TokenDenylist()
@@ -1,14 +1,27 @@
 # app/schemas.py
 
 from .extensions import ma
-from .models import User, Habit, HabitLog, MoodLog
-from marshmallow import fields, validate
+from .models import User, Habit, HabitLog, MoodLog, Job
+from .jobs import JOB_HANDLERS, JOB_PARAMS_SCHEMAS
+from .search import MIN_QUERY_LENGTH
+from marshmallow import (
+    fields, validate, ValidationError, EXCLUDE, pre_load, validates_schema
+)
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def validate_timezone(name):
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Unknown timezone: {name}")
 
 
 class UserSchema(ma.SQLAlchemyAutoSchema):
     # 僅在載入/反序列化時(例如，從註冊請求)識別 password 欄位
     # load_only=True 確保密碼永遠不會被序列化回傳
     password = fields.Str(load_only=True, required=True)
+    timezone = fields.Str(validate=validate_timezone)
 
     class Meta:
         model = User
@@ -17,6 +30,20 @@ class UserSchema(ma.SQLAlchemyAutoSchema):
         exclude = ("password_hash",)
 
 
+class LoginSchema(ma.Schema):
+    email = fields.Str(
+        load_only=True, required=True, validate=validate.Length(min=1)
+    )
+    password = fields.Str(
+        load_only=True, required=True, validate=validate.Length(min=1)
+    )
+    user = fields.Nested(UserSchema, dump_only=True)
+    token = fields.Str(dump_only=True)
+
+    class Meta:
+        unknown = EXCLUDE
+
+
 class HabitSchema(ma.SQLAlchemyAutoSchema):
     user_id = fields.Integer(load_only=True)
 
@@ -24,6 +51,7 @@ class HabitSchema(ma.SQLAlchemyAutoSchema):
         model = Habit
         load_instance = True
         include_fk = True  # 包含 user_id
+        dump_only = ("total_completions", "last_log_date", "current_streak")
 
 
 class HabitLogSchema(ma.SQLAlchemyAutoSchema):
@@ -45,3 +73,160 @@ class MoodLogSchema(ma.SQLAlchemyAutoSchema):
         model = MoodLog
         load_instance = False  # Returns dict on load
         include_fk = True  # 包含 user_id
+
+
+class ErrorSchema(ma.Schema):
+    """錯誤回應；欄位驗證失敗時則為 {欄位名稱: [錯誤訊息, ...]}"""
+    message = fields.Str()
+    # 批次請求中各項目的錯誤
+    errors = fields.List(fields.Dict())
+
+
+class HabitBatchResultSchema(ma.Schema):
+    index = fields.Integer()
+    status = fields.Integer()
+    id = fields.Integer()
+    habit = fields.Nested(HabitSchema)
+
+
+class HabitIdsSchema(ma.Schema):
+    ids = fields.List(fields.Integer(), required=True)
+
+
+SUMMARY_BUCKETS = ('week', 'month')
+SEARCH_MAX_PER_PAGE = 100
+
+
+class QuerySchema(ma.Schema):
+    """以 schema.load(request.args) 載入查詢字串參數"""
+    class Meta:
+        unknown = EXCLUDE
+
+    @pre_load
+    def _from_args(self, data, **kwargs):
+        # 只有宣告為 List 的參數可重複，其餘取第一個值並去除空白
+        if not hasattr(data, 'getlist'):
+            return data
+        lists = {
+            field.data_key or name
+            for name, field in self.load_fields.items()
+            if isinstance(field, fields.List)
+        }
+        return {
+            key: data.getlist(key) if key in lists else data[key].strip()
+            for key in data
+        }
+
+
+class MoodSummaryQuerySchema(QuerySchema):
+    bucket = fields.Str(
+        load_default='week', validate=validate.OneOf(SUMMARY_BUCKETS)
+    )
+    date_from = fields.Date(data_key='from')
+    date_to = fields.Date(data_key='to')
+
+
+class MoodSummarySchema(ma.Schema):
+    # 週 (週一) 或月的第一天
+    bucket = fields.Str()
+    mood_count = fields.Integer()
+    avg_rating = fields.Float(allow_none=True)
+    min_rating = fields.Integer(allow_none=True)
+    max_rating = fields.Integer(allow_none=True)
+    habit_completions = fields.Integer()
+
+
+class MoodSearchQuerySchema(QuerySchema):
+    q = fields.Str(
+        required=True, validate=validate.Length(min=MIN_QUERY_LENGTH)
+    )
+    page = fields.Integer(load_default=1, validate=validate.Range(min=1))
+    per_page = fields.Integer(
+        load_default=20,
+        validate=validate.Range(min=1, max=SEARCH_MAX_PER_PAGE)
+    )
+
+
+class MoodSearchItemSchema(ma.Schema):
+    id = fields.Integer()
+    log_date = fields.Str()
+    rating = fields.Integer()
+    notes = fields.Str(allow_none=True)
+    # 以 <mark> 標示命中字詞的摘要
+    snippet = fields.Str()
+
+
+class MoodSearchResultSchema(ma.Schema):
+    items = fields.List(fields.Nested(MoodSearchItemSchema))
+    page = fields.Integer()
+    per_page = fields.Integer()
+    has_more = fields.Boolean()
+
+
+class SyncQuerySchema(QuerySchema):
+    # 上次同步取得的 token；省略或為 0 時回傳完整資料
+    since = fields.Integer(load_default=0)
+
+
+class SyncSchema(ma.Schema):
+    token = fields.Integer()
+    habits = fields.List(fields.Nested(HabitSchema))
+    habit_logs = fields.List(fields.Nested(HabitLogSchema))
+    mood_logs = fields.List(fields.Nested(MoodLogSchema))
+    # 各實體被刪除的 id；刪除的習慣代表其紀錄一併刪除，紀錄不會另外列出
+    deleted = fields.Dict(
+        keys=fields.Str(), values=fields.List(fields.Integer())
+    )
+
+
+class HabitForecastSchema(ma.Schema):
+    habit_id = fields.Integer()
+    name = fields.Str()
+    # 完成此習慣對當天心情的估計影響
+    effect = fields.Float()
+    predicted = fields.Float()
+
+
+class ForecastQuerySchema(QuerySchema):
+    # 預測今天完成這些習慣後的心情；可重複
+    habit_id = fields.List(fields.Integer(), load_default=list)
+
+
+class ForecastSchema(ma.Schema):
+    date = fields.Date()
+    samples = fields.Integer()
+    previous_rating = fields.Integer(allow_none=True)
+    lag_effect = fields.Float()
+    baseline = fields.Float()
+    predicted = fields.Float()
+    habits = fields.List(fields.Nested(HabitForecastSchema))
+
+
+def validate_job_kind(kind):
+    # 於驗證時才查表，讓之後註冊的工作類型也能被接受
+    if kind not in JOB_HANDLERS:
+        raise ValidationError(f"Unknown job kind: {kind}")
+
+
+class JobSchema(ma.SQLAlchemyAutoSchema):
+    kind = fields.Str(required=True, validate=validate_job_kind)
+    params = fields.Dict(load_default=dict)
+    priority = fields.Integer(
+        load_default=0, validate=validate.Range(min=-10, max=10)
+    )
+
+    @validates_schema
+    def _validate_params(self, data, **kwargs):
+        # 各工作類型的參數由 job_handler 註冊的 schema 驗證
+        errors = JOB_PARAMS_SCHEMAS[data['kind']].validate(data['params'])
+        if errors:
+            raise ValidationError(errors, field_name='params')
+
+    class Meta:
+        model = Job
+        load_instance = False  # Returns dict on load
+        exclude = ("dedup_key",)
+        dump_only = (
+            "id", "status", "result", "error",
+            "created_at", "started_at", "finished_at",
+        )
@@ -0,0 +1,137 @@
+# app/search.py
+
+from sqlalchemy import event, text
+
+from .extensions import db
+from .models import MoodLog
+
+# 搜尋字串的最短長度；SQLite 使用 trigram 分詞以支援中文，至少需要 3 個字元
+MIN_QUERY_LENGTH = 3
+
+# SQLite: FTS5 external content 表格，由觸發器與 mood_logs 保持同步。
+# owner 欄位以 <user_id> 標記擁有者 (前後的括號避免 <4> 命中 <42>)，
+# 搜尋時與筆記一起 MATCH，只需處理該使用者的紀錄；內容來源為附帶此欄位的檢視表
+SQLITE_DDL = [
+    """
+    CREATE VIEW IF NOT EXISTS mood_logs_fts_content AS
+    SELECT id, notes, '<' || user_id || '>' AS owner FROM mood_logs
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS mood_logs_fts USING fts5(
+        notes, owner, content='mood_logs_fts_content', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mood_logs_fts_insert
+    AFTER INSERT ON mood_logs BEGIN
+        INSERT INTO mood_logs_fts(rowid, notes, owner)
+        VALUES (new.id, new.notes, '<' || new.user_id || '>');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mood_logs_fts_delete
+    AFTER DELETE ON mood_logs BEGIN
+        INSERT INTO mood_logs_fts(mood_logs_fts, rowid, notes, owner)
+        VALUES ('delete', old.id, old.notes, '<' || old.user_id || '>');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS mood_logs_fts_update
+    AFTER UPDATE OF notes, user_id ON mood_logs BEGIN
+        INSERT INTO mood_logs_fts(mood_logs_fts, rowid, notes, owner)
+        VALUES ('delete', old.id, old.notes, '<' || old.user_id || '>');
+        INSERT INTO mood_logs_fts(rowid, notes, owner)
+        VALUES (new.id, new.notes, '<' || new.user_id || '>');
+    END
+    """,
+]
+# 重建時先移除舊結構，讓既有資料庫也換成目前的欄位與觸發器
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS mood_logs_fts_insert",
+    "DROP TRIGGER IF EXISTS mood_logs_fts_delete",
+    "DROP TRIGGER IF EXISTS mood_logs_fts_update",
+    "DROP TABLE IF EXISTS mood_logs_fts",
+    "DROP VIEW IF EXISTS mood_logs_fts_content",
+]
+SQLITE_REBUILD = "INSERT INTO mood_logs_fts(mood_logs_fts) VALUES ('rebuild')"
+
+# PostgreSQL: 由資料庫自動維護的 tsvector 生成欄位，與 user_id 組成複合
+# GIN 索引 (btree_gin)，先以使用者縮小範圍再比對詞彙
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS btree_gin",
+    """
+    ALTER TABLE mood_logs ADD COLUMN IF NOT EXISTS notes_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(notes, ''))) STORED
+    """,
+    "DROP INDEX IF EXISTS ix_mood_logs_notes_tsv",
+    """
+    CREATE INDEX IF NOT EXISTS ix_mood_logs_user_notes_tsv
+    ON mood_logs USING GIN (user_id, notes_tsv)
+    """,
+]
+
+SQLITE_SEARCH = text("""
+    SELECT m.id, m.log_date, m.rating, m.notes,
+           snippet(mood_logs_fts, 0, '<mark>', '</mark>', '…', 12) AS snippet
+    FROM mood_logs_fts
+    JOIN mood_logs AS m ON m.id = mood_logs_fts.rowid
+    WHERE mood_logs_fts MATCH :query AND m.user_id = :user_id
+    ORDER BY bm25(mood_logs_fts, 1.0, 0.0), m.log_date DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+POSTGRESQL_SEARCH = text("""
+    SELECT m.id, m.log_date, m.rating, m.notes,
+           ts_headline('simple', m.notes, q,
+                       'StartSel=<mark>, StopSel=</mark>, MaxFragments=1')
+               AS snippet
+    FROM mood_logs AS m, plainto_tsquery('simple', :query) AS q
+    WHERE m.notes_tsv @@ q AND m.user_id = :user_id
+    ORDER BY ts_rank(m.notes_tsv, q) DESC, m.log_date DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def _dialect(connection):
+    return connection.dialect.name
+
+
+def create_search_index(connection, rebuild=False):
+    """建立 (或重建) 心情筆記的全文檢索索引"""
+    if _dialect(connection) == 'sqlite':
+        for statement in SQLITE_DROP if rebuild else []:
+            connection.execute(text(statement))
+        for statement in SQLITE_DDL:
+            connection.execute(text(statement))
+        if rebuild:
+            connection.execute(text(SQLITE_REBUILD))
+    elif _dialect(connection) == 'postgresql':
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+
+
+@event.listens_for(MoodLog.__table__, 'after_create')
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
+
+
+def _fts5_query(user_id, query):
+    # 以片語查詢，避免使用者輸入的引號或運算子被當成 FTS5 語法
+    phrase = '"' + query.replace('"', '""') + '"'
+    return f'owner:"<{int(user_id)}>" AND notes:{phrase}'
+
+
+def search_mood_notes(user_id, query, limit, offset=0):
+    """依相關度排序搜尋使用者的心情筆記"""
+    connection = db.session.connection()
+    if _dialect(connection) == 'postgresql':
+        statement = POSTGRESQL_SEARCH
+    else:
+        statement, query = SQLITE_SEARCH, _fts5_query(user_id, query)
+    return connection.execute(statement, {
+        'query': query,
+        'user_id': user_id,
+        'limit': limit,
+        'offset': offset,
+    }).mappings().all()
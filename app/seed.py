@@ -0,0 +1,194 @@
+# app/seed.py
+
+import csv
+import io
+import random
+from datetime import date, datetime, time, timedelta, UTC
+
+from sqlalchemy import func, select, text
+from werkzeug.security import generate_password_hash
+
+from .extensions import db
+from .models import User, Habit, HabitLog, MoodLog
+
+SEED_PASSWORD = 'password123'
+SEED_END_DATE = date(2025, 12, 31)
+HABIT_NAMES = (
+    '晨間運動', '閱讀 30 分鐘', '冥想', '喝 2000cc 水', '早睡',
+    '寫日記', '散步', '學英文', '不喝含糖飲料', '整理房間',
+    '伸展', '練習樂器',
+)
+MOOD_NOTES = (
+    None, None, None, '睡得很好', '工作很累', '和朋友聚餐',
+    'Slept badly', 'Great workout today', '有點焦慮', 'Quiet day at home',
+)
+
+
+def _max_id(connection, model):
+    return connection.execute(select(func.max(model.id))).scalar() or 0
+
+
+def _copy_rows(connection, table, rows):
+    """以 PostgreSQL COPY 寫入資料 (支援 psycopg2 與 psycopg 3)"""
+    columns = list(rows[0])
+    statement = f"COPY {table.name} ({', '.join(columns)}) FROM STDIN"
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in rows:
+                writer.writerow(
+                    '\\N' if row[c] is None else row[c] for c in columns
+                )
+            buffer.seek(0)
+            cursor.copy_expert(
+                statement + " WITH (FORMAT csv, NULL '\\N')", buffer
+            )
+        else:
+            with cursor.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row([row[c] for c in columns])
+    finally:
+        cursor.close()
+
+
+def bulk_insert(connection, model, rows):
+    """以 Core 批次寫入；PostgreSQL 改用 COPY"""
+    if not rows:
+        return
+    if connection.dialect.name == 'postgresql':
+        _copy_rows(connection, model.__table__, rows)
+    else:
+        connection.execute(model.__table__.insert(), rows)
+
+
+def _reset_sequences(connection):
+    # 明確指定 id 寫入後，PostgreSQL 的序列需同步到目前最大值
+    if connection.dialect.name != 'postgresql':
+        return
+    for model in (User, Habit, HabitLog, MoodLog):
+        table = model.__tablename__
+        connection.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+            f"(SELECT max(id) FROM {table}))"
+        ))
+
+
+def _generate_user(rng, ids, habits_per_user, days, end_date):
+    """產生單一使用者的所有資料列；心情評分會受完成的習慣影響"""
+    start = end_date - timedelta(days=days - 1)
+    created_at = datetime.combine(start, time(9), tzinfo=UTC)
+    ids['user'] += 1
+    user_id = ids['user']
+    user = {
+        'id': user_id,
+        'username': f'seed{user_id}',
+        'email': f'seed{user_id}@example.com',
+        'password_hash': ids['password_hash'],
+        'created_at': created_at,
+        'timezone': 'UTC',
+    }
+
+    habits, habit_logs = [], []
+    done_by_day = [0] * days
+    names = rng.sample(HABIT_NAMES, min(habits_per_user, len(HABIT_NAMES)))
+    for name in names:
+        ids['habit'] += 1
+        habit_id = ids['habit']
+        probability = rng.uniform(0.2, 0.9)
+        total, last, streak = 0, None, 0
+        for offset in range(days):
+            if rng.random() >= probability:
+                continue
+            log_date = start + timedelta(days=offset)
+            ids['habit_log'] += 1
+            habit_logs.append({
+                'id': ids['habit_log'],
+                'habit_id': habit_id,
+                'log_date': log_date,
+                'value': 1,
+                'created_at': created_at + timedelta(days=offset, hours=12),
+            })
+            done_by_day[offset] += 1
+            streak = streak + 1 if last == log_date - timedelta(days=1) else 1
+            total, last = total + 1, log_date
+        habits.append({
+            'id': habit_id,
+            'user_id': user_id,
+            'name': name,
+            'description': None,
+            'frequency': 'daily',
+            'start_date': start,
+            'end_date': None,
+            'created_at': created_at,
+            'total_completions': total,
+            'last_log_date': last,
+            'current_streak': streak,
+        })
+
+    moods = []
+    baseline = rng.uniform(2.0, 4.0)
+    for offset in range(days):
+        if rng.random() >= 0.85:
+            continue
+        score = baseline + 0.3 * done_by_day[offset] + rng.gauss(0, 0.8)
+        ids['mood'] += 1
+        moods.append({
+            'id': ids['mood'],
+            'user_id': user_id,
+            'rating': min(5, max(1, round(score))),
+            'notes': rng.choice(MOOD_NOTES),
+            'log_date': start + timedelta(days=offset),
+            'created_at': created_at + timedelta(days=offset, hours=21),
+        })
+    return user, habits, habit_logs, moods
+
+
+def seed_database(
+    users=1000, habits_per_user=10, days=3 * 365, seed=0,
+    end_date=SEED_END_DATE, chunk_size=100, progress=None
+):
+    """產生確定性的大量測試資料，回傳各表格寫入的列數。
+
+    相同的參數 (與空的資料庫) 永遠產生相同的資料。每 chunk_size 位使用者
+    以 Core 批次寫入並提交一次，記憶體用量與總資料量無關。
+    """
+    rng = random.Random(seed)
+    connection = db.session.connection()
+    ids = {
+        'user': _max_id(connection, User),
+        'habit': _max_id(connection, Habit),
+        'habit_log': _max_id(connection, HabitLog),
+        'mood': _max_id(connection, MoodLog),
+        # 雜湊刻意很慢，所有使用者共用同一組密碼雜湊
+        'password_hash': generate_password_hash(SEED_PASSWORD),
+    }
+    counts = {'users': 0, 'habits': 0, 'habit_logs': 0, 'mood_logs': 0}
+
+    for chunk_start in range(0, users, chunk_size):
+        batch = {key: [] for key in counts}
+        for _ in range(chunk_start, min(chunk_start + chunk_size, users)):
+            user, habits, habit_logs, moods = _generate_user(
+                rng, ids, habits_per_user, days, end_date
+            )
+            batch['users'].append(user)
+            batch['habits'].extend(habits)
+            batch['habit_logs'].extend(habit_logs)
+            batch['mood_logs'].extend(moods)
+
+        connection = db.session.connection()
+        bulk_insert(connection, User, batch['users'])
+        bulk_insert(connection, Habit, batch['habits'])
+        bulk_insert(connection, HabitLog, batch['habit_logs'])
+        bulk_insert(connection, MoodLog, batch['mood_logs'])
+        db.session.commit()
+
+        for key in counts:
+            counts[key] += len(batch[key])
+        if progress:
+            progress(counts)
+
+    _reset_sequences(db.session.connection())
+    db.session.commit()
+    return counts
@@ -0,0 +1,56 @@
+# app/server.py
+
+import multiprocessing
+
+from gunicorn.app.base import BaseApplication
+
+from .extensions import db
+
+
+def default_workers():
+    """Gunicorn 建議的 worker 數量: (2 x CPU 核心數) + 1"""
+    return multiprocessing.cpu_count() * 2 + 1
+
+
+class PreforkServer(BaseApplication):
+    """以 Gunicorn 執行已建立的 Flask app 的 pre-fork 伺服器。
+
+    app 在 master 行程中載入 (preload_app)，fork 後 worker 以 copy-on-write
+    共用已匯入的模組；每個 worker 啟動時會丟棄繼承來的資料庫連線池。
+    """
+
+    def __init__(self, app, options=None):
+        self.application = app
+        self.options = options or {}
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            if key in self.cfg.settings and value is not None:
+                self.cfg.set(key.lower(), value)
+        self.cfg.set('preload_app', True)
+        self.cfg.set('post_fork', self.post_fork)
+
+    def load(self):
+        return self.application
+
+    def post_fork(self, server, worker):
+        # 連線池中的 socket 不可在行程間共用；close=False 避免關閉 master 的連線
+        with self.application.app_context():
+            db.engine.dispose(close=False)
+
+
+def serve(app, bind, workers, threads, timeout):
+    """啟動 pre-fork 伺服器。
+
+    對 master 送出 SIGHUP 會優雅地替換所有 worker；由於 app 已預先載入，
+    部署新程式碼時需送出 SIGUSR2 啟動新的 master，再以 SIGTERM 結束舊的。
+    """
+    PreforkServer(app, {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread' if threads > 1 else 'sync',
+        'timeout': timeout,
+        'graceful_timeout': timeout,
+    }).run()
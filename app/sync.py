@@ -0,0 +1,120 @@
+# app/sync.py
+
+from sqlalchemy import (
+    event, select, delete, insert, func, and_, or_, inspect
+)
+from sqlalchemy.orm import Session
+
+from .extensions import db
+from .models import ChangeLog, Habit, HabitLog, MoodLog
+
+# pg_advisory_xact_lock 的命名空間 (第一個參數)，第二個參數為 user_id
+SYNC_LOCK_NAMESPACE = 0x5359
+SYNC_ENTITIES = {
+    Habit: 'habits',
+    HabitLog: 'habit_logs',
+    MoodLog: 'mood_logs',
+}
+
+
+def current_token(user_id):
+    """使用者目前的同步 token；任何習慣或紀錄的變更都會讓它遞增。
+
+    同一位使用者的變更紀錄依提交順序取得 id (見 _lock_users)，因此用戶端
+    取得 token 之後不會再出現比它小的 id。
+    """
+    return db.session.query(func.max(ChangeLog.id)).filter_by(
+        user_id=user_id
+    ).scalar() or 0
+
+
+def _lock_users(connection, user_ids):
+    """在配置變更紀錄 id 之前鎖定使用者，直到交易結束。
+
+    PostgreSQL 的序列值在插入時配置，並行交易可能以不同於 id 的順序提交；
+    用戶端若在兩者之間同步，就會永久跳過較小的 id。以交易層級的 advisory
+    lock 讓同一位使用者的寫入依序配置並提交 id，不同使用者之間互不影響。
+    SQLite 同時只有一個寫入交易，不需要鎖定。
+    """
+    if connection.dialect.name != 'postgresql':
+        return
+    # 依固定順序鎖定，避免死結
+    for user_id in sorted({int(user_id) for user_id in user_ids}):
+        connection.execute(
+            select(func.pg_advisory_xact_lock(SYNC_LOCK_NAMESPACE, user_id))
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def record_changes(session, flush_context):
+    """在同一個交易中把習慣、習慣紀錄與心情紀錄的變更寫入 change_logs。
+
+    習慣的紀錄由 ON DELETE CASCADE 刪除，不會個別留下刪除紀錄；用戶端收到
+    習慣的刪除時應一併移除其紀錄，刪除習慣的成本因此與紀錄數量無關。
+    """
+    changes = [
+        (obj, False) for obj in session.new if type(obj) in SYNC_ENTITIES
+    ]
+    changes += [
+        (obj, False) for obj in session.dirty
+        if type(obj) in SYNC_ENTITIES and session.is_modified(obj)
+    ]
+    changes += [
+        (obj, True) for obj in session.deleted
+        if type(obj) in SYNC_ENTITIES
+    ]
+    if not changes:
+        return
+
+    connection = session.connection()
+
+    # HabitLog 沒有 user_id，從所屬的 Habit 取得；同批刪除的 Habit 已不在資料庫中
+    habit_owners = {
+        obj.id: obj.user_id for obj, deleted in changes
+        if deleted and isinstance(obj, Habit)
+    }
+    for obj, _ in changes:
+        if isinstance(obj, HabitLog) and obj.habit_id not in habit_owners:
+            # 已在 session 中 (例如剛鎖定並更新統計) 的習慣不需再查詢
+            habit = session.identity_map.get(
+                session.identity_key(Habit, obj.habit_id)
+            )
+            user_id = inspect(habit).dict.get('user_id') if habit else None
+            if user_id is not None:
+                habit_owners[obj.habit_id] = user_id
+    missing = {
+        obj.habit_id for obj, _ in changes
+        if isinstance(obj, HabitLog) and obj.habit_id not in habit_owners
+    }
+    if missing:
+        habit_owners.update(connection.execute(
+            select(Habit.id, Habit.user_id).where(Habit.id.in_(missing))
+        ).all())
+
+    rows = []
+    for obj, deleted in changes:
+        if isinstance(obj, HabitLog):
+            user_id = habit_owners.get(obj.habit_id)
+            if user_id is None:
+                continue
+        else:
+            user_id = obj.user_id
+        rows.append({
+            'user_id': user_id,
+            'entity': SYNC_ENTITIES[type(obj)],
+            'entity_id': obj.id,
+            'deleted': deleted,
+        })
+    if not rows:
+        return
+
+    _lock_users(connection, {row['user_id'] for row in rows})
+    # 以單一 DELETE 刪除舊紀錄後重新插入，讓每個實體取得新的、遞增的 id
+    ids = {}
+    for row in rows:
+        ids.setdefault(row['entity'], []).append(row['entity_id'])
+    connection.execute(delete(ChangeLog).where(or_(*(
+        and_(ChangeLog.entity == entity, ChangeLog.entity_id.in_(entity_ids))
+        for entity, entity_ids in sorted(ids.items())
+    ))))
+    connection.execute(insert(ChangeLog), rows)
@@ -91,6 +91,11 @@ export async function registerUser(userData) {
 
 // --- User API (需要 Token) ---
 
+export async function logoutUser() {
+  // 撤銷目前的 JWT，之後即使 token 外流也無法再使用
+  return apiFetch('/api/v1/auth/logout', { method: 'POST' });
+}
+
 export async function fetchUserProfile() {
   // 注意：這個端點可能也需要 /api/v1 前綴，取決於它的 Blueprint 如何定義
   return apiFetch('/api/v1/users/me');
@@ -124,3 +129,9 @@ export async function fetchMoodLogForDate(date) {
 export async function logMood(moodData) {
   return apiFetch('/api/v1/moods', { method: 'POST', body: moodData });
 }
+
+// --- Sync API (需要 Token) ---
+
+export async function fetchChanges(since = 0) {
+  return apiFetch(`/api/v1/sync?since=${since}`);
+}
@@ -10,15 +10,16 @@ import {
   login as apiLogin,
   register as apiRegister,
   fetchUserProfile,
+  logoutUser,
   // Habits
-  fetchHabits,
-  fetchHabitLogs,
   addHabit,
   deleteHabit,
   updateHabit,
   // Moods
   fetchMoodLogForDate,
   logMood,
+  // Sync
+  fetchChanges,
 } from '../api.js';
 
 // --- 輔助函式 ---
@@ -26,22 +27,48 @@ function getTodayDateString() {
   return new Date().toISOString().split('T')[0];
 }
 
+/**
+ * 以同步結果更新清單：移除已刪除的項目，並以新版本取代或加入更新的項目。
+ * @param {Array} items - 目前的清單。
+ * @param {Array} updated - 新增或修改的項目。
+ * @param {Function} isDeleted - 判斷項目是否已被刪除。
+ */
+function mergeChanges(items, updated, isDeleted) {
+  const updatedIds = new Set(updated.map((item) => item.id));
+  return items
+    .filter((item) => !updatedIds.has(item.id) && !isDeleted(item))
+    .concat(updated);
+}
+
 // --- 應用程式邏輯 ---
 
 /**
  * 載入主應用程式數據 (習慣、心情日誌等)。
+ * 第一次載入取得完整資料，之後只以同步 token 取得變更的部分。
  */
 export async function loadMainAppData() {
   setState({ isLoading: { main: true }, error: null });
   try {
-    const [habits, moods, habitLogs] = await Promise.all([
-      fetchHabits(),
-      fetchMoods(), // 獲取所有心情日誌
-      fetchHabitLogs(), // 獲取所有習慣日誌
-    ]);
-    if (habits === null || moods === null || habitLogs === null) throw new Error("讀取您的資料時發生錯誤。");
-
-    setState({ habits, moods, habitLogs, isLoading: { main: false } });
+    const changes = await fetchChanges(state.syncToken);
+    if (changes === null) throw new Error("讀取您的資料時發生錯誤。");
+
+    const deleted = {
+      habits: new Set(changes.deleted.habits),
+      habit_logs: new Set(changes.deleted.habit_logs),
+      mood_logs: new Set(changes.deleted.mood_logs),
+    };
+    setState({
+      habits: mergeChanges(state.habits, changes.habits, (h) => deleted.habits.has(h.id)),
+      // 刪除的習慣不會逐筆列出其日誌，需一併移除
+      habitLogs: mergeChanges(
+        state.habitLogs,
+        changes.habit_logs,
+        (log) => deleted.habit_logs.has(log.id) || deleted.habits.has(log.habit_id)
+      ),
+      moods: mergeChanges(state.moods, changes.mood_logs, (m) => deleted.mood_logs.has(m.id)),
+      syncToken: changes.token,
+      isLoading: { main: false },
+    });
   } catch (error) {
     setState({ error: { message: error.message }, isLoading: { main: false } });
   }
@@ -83,7 +110,12 @@ export async function handleMainAppClick(event) {
             loadMainAppData();
             break;
         case "logout":
-            setState({ authToken: null, isAuthenticated: false, user: null, habits: [], currentView: 'auth' });
+            // 即使撤銷失敗 (例如 token 已過期) 也照常登出
+            await logoutUser().catch(() => {});
+            setState({
+                authToken: null, isAuthenticated: false, user: null, currentView: 'auth',
+                habits: [], moods: [], habitLogs: [], syncToken: 0,
+            });
             break;
         case "delete-habit": {
             const habitId = Number(event.target.closest(".habit-item")?.dataset.habitId);
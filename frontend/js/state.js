@@ -11,6 +11,7 @@ export const state = {
   moods: [], // 儲存所有心情日誌
   habitLogs: [], // 儲存所有習慣日誌
   todayMoodLog: null,
+  syncToken: 0, // 最後一次同步取得的 change token，用於增量同步
   // App status
   isLoading: {
     auth: true, // 認證檢查開始時為 true
@@ -9,3 +9,8 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 背景工作執行緒數量
+    JOBS_MAX_WORKERS = int(os.environ.get('JOBS_MAX_WORKERS', 2))
+    # pre-fork 伺服器 (flask serve) 的 worker 與執行緒數量；未設定時依 CPU 核心數
+    SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', 0)) or None
+    SERVER_THREADS = int(os.environ.get('SERVER_THREADS', 2))
@@ -0,0 +1,185 @@
+"""add user timezone, habit completion stats, mood summary index and cascades
+
+Revision ID: 2b5b6216abfd
+Revises:
+Create Date: 2026-10-19 00:20:00.000000
+
+"""
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b5b6216abfd'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# SQLite 重建表格時替未命名的外鍵命名，才能將其替換為 ON DELETE CASCADE
+NAMING_CONVENTION = {
+    "fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s",
+}
+# (表格, 外鍵欄位, 參照表格)
+CASCADES = (
+    ('habits', 'user_id', 'users'),
+    ('habit_logs', 'habit_id', 'habits'),
+    ('mood_logs', 'user_id', 'users'),
+)
+
+habits = sa.table(
+    'habits', sa.column('id', sa.Integer),
+    sa.column('total_completions', sa.Integer),
+    sa.column('last_log_date', sa.Date),
+    sa.column('current_streak', sa.Integer),
+)
+habit_logs = sa.table(
+    'habit_logs', sa.column('habit_id', sa.Integer),
+    sa.column('log_date', sa.Date),
+)
+
+
+def _has_column(table, column):
+    # 新建立的資料庫已由 db.create_all() 建立完整的結構
+    columns = sa.inspect(op.get_bind()).get_columns(table)
+    return any(c['name'] == column for c in columns)
+
+
+def _has_foreign_key_cascade(table):
+    foreign_keys = sa.inspect(op.get_bind()).get_foreign_keys(table)
+    return any(
+        (fk['options'].get('ondelete') or '').upper() == 'CASCADE'
+        for fk in foreign_keys
+    )
+
+
+def _foreign_key_name(table, column, referred):
+    if op.get_bind().dialect.name == 'sqlite':
+        return NAMING_CONVENTION['fk'] % {
+            'table_name': table, 'column_0_name': column,
+            'referred_table_name': referred,
+        }
+    # PostgreSQL 對未命名外鍵的預設名稱
+    return f'{table}_{column}_fkey'
+
+
+def _replace_foreign_key(batch_op, table, cascade):
+    _, column, referred = next(c for c in CASCADES if c[0] == table)
+    name = _foreign_key_name(table, column, referred)
+    batch_op.drop_constraint(name, type_='foreignkey')
+    batch_op.create_foreign_key(
+        name, referred, [column], ['id'],
+        ondelete='CASCADE' if cascade else None
+    )
+
+
+def _backfill_habit_stats(connection):
+    """與 app.habit_stats.compute_habit_stats 相同的計算，於遷移中自成一體"""
+    rows = connection.execute(
+        sa.select(habit_logs.c.habit_id, habit_logs.c.log_date).order_by(
+            habit_logs.c.habit_id, habit_logs.c.log_date.desc()
+        )
+    )
+    for habit_id, group in groupby(rows, key=lambda row: row[0]):
+        dates = [log_date for _, log_date in group]
+        streak = 1
+        for newer, older in zip(dates, dates[1:]):
+            if (newer - older).days != 1:
+                break
+            streak += 1
+        connection.execute(
+            habits.update().where(habits.c.id == habit_id).values(
+                total_completions=len(dates), last_log_date=dates[0],
+                current_streak=streak
+            )
+        )
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite':
+        # 重建表格時舊表會被刪除，需暫停外鍵檢查以免連帶刪除子資料
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+
+    if not _has_column('users', 'timezone'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column(
+                'timezone', sa.String(length=64), nullable=False,
+                server_default='UTC'
+            ))
+
+    if not _has_column('habits', 'total_completions'):
+        with op.batch_alter_table(
+            'habits', naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            batch_op.add_column(sa.Column(
+                'total_completions', sa.Integer(), nullable=False,
+                server_default='0'
+            ))
+            batch_op.add_column(
+                sa.Column('last_log_date', sa.Date(), nullable=True)
+            )
+            batch_op.add_column(sa.Column(
+                'current_streak', sa.Integer(), nullable=False,
+                server_default='0'
+            ))
+            batch_op.create_index('ix_habits_user_id', ['user_id'])
+            _replace_foreign_key(batch_op, 'habits', cascade=True)
+        _backfill_habit_stats(connection)
+
+    if not _has_foreign_key_cascade('habit_logs'):
+        with op.batch_alter_table(
+            'habit_logs', naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            _replace_foreign_key(batch_op, 'habit_logs', cascade=True)
+
+    if not _has_foreign_key_cascade('mood_logs'):
+        with op.batch_alter_table(
+            'mood_logs', naming_convention=NAMING_CONVENTION
+        ) as batch_op:
+            # log_date 即為使用者日曆上的日期；涵蓋索引供區間彙總使用
+            batch_op.create_index(
+                'ix_mood_logs_user_log_date_rating',
+                ['user_id', 'log_date', 'rating']
+            )
+            _replace_foreign_key(batch_op, 'mood_logs', cascade=True)
+
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+    # 重建 mood_logs 會移除全文檢索的觸發器；既有資料庫也需建立索引
+    from app.search import create_search_index
+    create_search_index(connection, rebuild=True)
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+
+    with op.batch_alter_table(
+        'mood_logs', naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        batch_op.drop_index('ix_mood_logs_user_log_date_rating')
+        _replace_foreign_key(batch_op, 'mood_logs', cascade=False)
+
+    with op.batch_alter_table(
+        'habit_logs', naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        _replace_foreign_key(batch_op, 'habit_logs', cascade=False)
+
+    with op.batch_alter_table(
+        'habits', naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        batch_op.drop_index('ix_habits_user_id')
+        batch_op.drop_column('current_streak')
+        batch_op.drop_column('last_log_date')
+        batch_op.drop_column('total_completions')
+        _replace_foreign_key(batch_op, 'habits', cascade=False)
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('timezone')
+
+    if connection.dialect.name == 'sqlite':
+        connection.exec_driver_sql("PRAGMA foreign_keys=ON")
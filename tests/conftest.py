@@ -1,6 +1,8 @@
+import os
 import pytest
 from app import create_app
 from app.extensions import db
+from app.seed import seed_database
 from instance.config import Config
 
 
@@ -9,6 +11,8 @@ class TestConfig(Config):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     # Disable CSRF protection in tests if you are using Flask-WTF/CSRFProtect
     WTF_CSRF_ENABLED = False
+    # Run background jobs synchronously inside the request
+    JOBS_RUN_INLINE = True
 
 
 @pytest.fixture(scope='function')
@@ -19,3 +23,22 @@ def client():
         yield app.test_client()
         db.session.remove()
         db.drop_all()
+
+
+@pytest.fixture
+def seed(client):
+    """Return a function that bulk-loads deterministic synthetic data."""
+    return seed_database
+
+
+@pytest.fixture
+def large_dataset(seed):
+    """A realistic multi-user dataset; scale it up with SEED_USERS/SEED_DAYS.
+
+    e.g. SEED_USERS=100000 SEED_DAYS=1095 pytest -k large_dataset
+    """
+    return seed(
+        users=int(os.environ.get('SEED_USERS', 50)),
+        habits_per_user=int(os.environ.get('SEED_HABITS_PER_USER', 5)),
+        days=int(os.environ.get('SEED_DAYS', 180)),
+    )
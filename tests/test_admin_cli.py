@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.seed import SEED_PASSWORD
+
+
+@pytest.fixture
+def runner(client, seed):
+    seed(users=6, habits_per_user=2, days=10)
+    return client.application.test_cli_runner()
+
+
+def test_show_users_hides_password_hashes(runner):
+    result = runner.invoke(args=["show-users"])
+    assert result.exit_code == 0
+    assert result.output.count("ID: ") == 6
+    assert "Password" not in result.output
+    assert "pbkdf2" not in result.output and "scrypt" not in result.output
+
+    result = runner.invoke(args=[
+        "show-users", "--email-like", "seed1%", "--limit", "1"
+    ])
+    assert result.output.count("ID: ") == 1
+    assert "seed1@example.com" in result.output
+
+
+def test_user_stats_uses_a_single_query(runner):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        result = runner.invoke(args=["user-stats", "--order-by", "moods"])
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert result.exit_code == 0
+    assert len(statements) == 1
+    assert "GROUP BY" in statements[0]
+
+    rows = [line.split() for line in result.output.splitlines()[1:-1]]
+    assert len(rows) == 6
+    assert all(int(habits) == 2 for _, habits, _, _ in rows)
+    moods = [int(moods) for _, _, moods, _ in rows]
+    assert moods == sorted(moods, reverse=True)
+    assert f"{sum(moods)} 筆心情紀錄" in result.output.splitlines()[-1]
+
+
+def test_export_users_streams_csv_and_jsonl(runner):
+    result = runner.invoke(args=["export-users", "--limit", "4"])
+    assert result.exit_code == 0
+    rows = list(csv.DictReader(io.StringIO(result.stdout)))
+    assert len(rows) == 4
+    assert set(rows[0]) == {
+        "id", "username", "email", "timezone", "created_at", "habits", "moods"
+    }
+    assert rows[0]["habits"] == "2"
+
+    result = runner.invoke(args=[
+        "export-users", "--format", "jsonl", "--email-like", "seed2@%"
+    ])
+    (row,) = [json.loads(line) for line in result.stdout.splitlines()]
+    assert row["email"] == "seed2@example.com"
+    assert SEED_PASSWORD not in result.stdout
+    assert "password_hash" not in row
@@ -0,0 +1,66 @@
+import pytest  # noqa: F401
+from datetime import date, timedelta
+from app.analytics import Moments, summarize_chunk
+from app.extensions import db
+from app.models import User, Habit, HabitLog, MoodLog, CohortStat
+
+
+def test_moments_merge_matches_single_pass():
+    values = [1, 2, 3, 4, 5, 5]
+    whole, left, right = Moments(), Moments(), Moments()
+    for value in values:
+        whole.add(value)
+    for value in values[:2]:
+        left.add(value)
+    for value in values[2:]:
+        right.add(value)
+    left.merge(right)
+    assert left.count == whole.count == 6
+    assert left.mean == pytest.approx(whole.mean)
+    assert left.stddev == pytest.approx(whole.stddev)
+
+
+def test_summarize_chunk_correlates_habits_with_mood():
+    start = date(2025, 9, 1).toordinal()  # a Monday
+    moods = [(1, start + i, 5 if i % 2 == 0 else 2) for i in range(8)]
+    habit_logs = [(1, "run", start + i) for i in range(0, 8, 2)]
+    result = summarize_chunk(moods, habit_logs)
+    # Mondays are day 0 (rated 5) and day 7 (rated 2)
+    assert result[("mood_by_weekday", "monday")].mean == 3.5
+    correlation = result[("habit_mood_correlation", "run")]
+    assert correlation.users == 1
+    assert correlation.mean == pytest.approx(1.0)
+
+
+def test_cohort_analytics_command_writes_results(client):
+    start = date(2025, 9, 1)
+    for user_index in range(3):
+        user = User(
+            username=f"cohort{user_index}",
+            email=f"cohort{user_index}@example.com",
+            password_hash="x"
+        )
+        habit = Habit(user=user, name=" Run ", frequency="daily")
+        db.session.add_all([user, habit])
+        for offset in range(14):
+            day = start + timedelta(days=offset)
+            done = offset % 2 == 0
+            db.session.add(MoodLog(
+                user=user, log_date=day, rating=5 if done else 3
+            ))
+            if done:
+                db.session.add(HabitLog(habit=habit, log_date=day))
+    db.session.commit()
+
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=[
+        "cohort-analytics", "--workers", "1", "--chunk-size", "2",
+        "--min-users", "3"
+    ])
+    assert result.exit_code == 0, result.output
+
+    stats = {(s.metric, s.key): s for s in CohortStat.query}
+    assert stats[("habit_mood_correlation", "run")].users == 3
+    assert stats[("habit_mood_correlation", "run")].mean == pytest.approx(1.0)
+    assert stats[("mood_by_weekday", "monday")].mean == pytest.approx(4.0)
+    assert stats[("mood_by_weekday", "monday")].samples == 6
@@ -1,5 +1,9 @@
 import pytest  # noqa: F401
-from app.models import User
+from datetime import datetime, UTC
+from flask_jwt_extended import decode_token
+from app.extensions import db
+from app.models import User, MoodLog, RevokedToken
+from app.revocation import token_denylist
 from werkzeug.security import check_password_hash
 
 
@@ -169,3 +173,135 @@ def test_login_missing_data(client):
     assert response.status_code == 400
     assert "message" in response.json
     assert response.json["message"] == "Missing email or password"
+
+
+def test_purge_users_cascades_in_batches(client):
+    for i in range(3):
+        client.post(
+            "/api/v1/auth/register",
+            json={
+                "username": f"purge{i}",
+                "email": f"purge{i}@example.com",
+                "password": "password123"
+            }
+        )
+    token = client.post(
+        "/api/v1/auth/login",
+        json={"email": "purge0@example.com", "password": "password123"}
+    ).json["token"]
+    client.post(
+        "/api/v1/moods",
+        json={"rating": 3, "log_date": "2025-09-01"},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=[
+        "purge-users", "--email-like", "purge%", "--batch-size", "2", "--yes"
+    ])
+    assert "3" in result.output
+    assert User.query.count() == 0
+    assert MoodLog.query.count() == 0
+
+
+def test_logout_revokes_token(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "logoutuser",
+            "email": "logout@example.com",
+            "password": "password123"
+        }
+    )
+    login = {"email": "logout@example.com", "password": "password123"}
+    token = client.post("/api/v1/auth/login", json=login).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    response = client.post("/api/v1/auth/logout", headers=headers)
+    assert response.status_code == 200
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+    # A fresh login is unaffected
+    token = client.post("/api/v1/auth/login", json=login).json["token"]
+    response = client.get(
+        "/api/v1/users/me", headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+
+
+def test_revocation_from_another_process_is_picked_up(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "otherworker",
+            "email": "other@example.com",
+            "password": "password123"
+        }
+    )
+    token = client.post(
+        "/api/v1/auth/login",
+        json={"email": "other@example.com", "password": "password123"}
+    ).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+
+    # Simulate a logout handled by another worker process
+    payload = decode_token(token)
+    db.session.add(RevokedToken(
+        jti=payload["jti"], user_id=1,
+        expires_at=datetime.fromtimestamp(payload["exp"], UTC).replace(
+            tzinfo=None
+        )
+    ))
+    db.session.commit()
+    token_denylist._next_refresh = 0
+
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
+
+
+def test_register_and_update_timezone(client):
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "tzuser",
+            "email": "tz@example.com",
+            "password": "password123",
+            "timezone": "Asia/Taipei"
+        }
+    )
+    assert response.status_code == 201
+    assert response.json["timezone"] == "Asia/Taipei"
+
+    response = client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "badtz",
+            "email": "badtz@example.com",
+            "password": "password123",
+            "timezone": "Mars/Olympus_Mons"
+        }
+    )
+    assert response.status_code == 400
+    assert "timezone" in response.json
+
+    token = client.post(
+        "/api/v1/auth/login",
+        json={"email": "tz@example.com", "password": "password123"}
+    ).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.patch(
+        "/api/v1/users/me", json={"timezone": "America/New_York"},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json["timezone"] == "America/New_York"
+
+    # Only settings may be changed through this endpoint
+    response = client.patch(
+        "/api/v1/users/me", json={"username": "renamed"}, headers=headers
+    )
+    assert response.status_code == 400
+    assert User.query.filter_by(email="tz@example.com").one().username == (
+        "tzuser"
+    )
@@ -0,0 +1,195 @@
+"""Concurrent-write stress harness for the hot write endpoints.
+
+Several processes, each running several threads with its own test client,
+fire the same track_habit / create_mood requests at the same moment, plus
+cross-user requests aimed at another user's habit. Every own write must
+answer 201 or 409 (never 500), every cross-user write 404, and afterwards
+each (habit, day) and (user, day) must hold exactly one row with
+consistent completion stats. Throughput is printed; run with -s to see it.
+
+SQLite runs against a WAL file database. PostgreSQL runs when
+STRESS_DATABASE_URL points at a disposable local database, e.g.
+STRESS_DATABASE_URL=postgresql+psycopg://localhost/mindtrack_stress
+Scale with STRESS_PROCESSES, STRESS_THREADS and STRESS_ROUNDS.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app import create_app
+from app.extensions import db
+from app.habit_stats import reconcile_habit_stats
+from app.models import HabitLog, MoodLog
+from tests.conftest import TestConfig
+
+PROCESSES = int(os.environ.get('STRESS_PROCESSES', 3))
+THREADS = int(os.environ.get('STRESS_THREADS', 4))
+ROUNDS = int(os.environ.get('STRESS_ROUNDS', 5))
+USERS = 3
+START = date(2026, 1, 1)
+OWN_WRITE = {201, 409}
+CROSS_USER_WRITE = {404}
+
+
+def make_app(database_url):
+    config = type('StressConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        # Unhandled errors must surface as 500 responses, as in production
+        'TESTING': False,
+        'PROPAGATE_EXCEPTIONS': False,
+    })
+    return create_app(config)
+
+
+def build_plan(users):
+    """Every worker sends the same requests, so every write is contended."""
+    plan = []
+    for day in range(ROUNDS):
+        log_date = (START + timedelta(days=day)).isoformat()
+        for index, (token, habit_ids) in enumerate(users):
+            other_habit = users[(index + 1) % len(users)][1][0]
+            for habit_id in habit_ids:
+                plan.append((token, f"/api/v1/habits/{habit_id}/track", {
+                    "habit_id": habit_id, "log_date": log_date
+                }, OWN_WRITE))
+            plan.append((token, "/api/v1/moods", {
+                "rating": day % 5 + 1, "log_date": log_date
+            }, OWN_WRITE))
+            plan.append((token, f"/api/v1/habits/{other_habit}/track", {
+                "habit_id": other_habit, "log_date": log_date
+            }, CROSS_USER_WRITE))
+    return plan
+
+
+def fire(database_url, plan, threads, barrier, results):
+    """Run `plan` from `threads` threads in this process once all are ready."""
+    app = make_app(database_url)
+    outcomes = []
+    lock = threading.Lock()
+
+    def worker():
+        client = app.test_client()
+        seen = []
+        barrier.wait()
+        started = time.time()
+        for token, path, body, allowed in plan:
+            response = client.post(
+                path, json=body, headers={'Authorization': f'Bearer {token}'}
+            )
+            seen.append((path, response.status_code, allowed))
+        with lock:
+            outcomes.append((started, time.time(), seen))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    results.put(outcomes)
+
+
+def _backends():
+    yield pytest.param('sqlite', id='sqlite-wal')
+    yield pytest.param('postgresql', id='postgresql', marks=pytest.mark.skipif(
+        not os.environ.get('STRESS_DATABASE_URL'),
+        reason='set STRESS_DATABASE_URL to a disposable PostgreSQL database'
+    ))
+
+
+@pytest.fixture(params=list(_backends()))
+def stress_app(request, tmp_path):
+    if request.param == 'sqlite':
+        database_url = f"sqlite:///{tmp_path / 'stress.db'}"
+    else:
+        database_url = os.environ['STRESS_DATABASE_URL']
+    app = make_app(database_url)
+    with app.app_context():
+        yield app, database_url
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def _register(client, index):
+    credentials = {
+        "email": f"stress{index}@example.com", "password": "password123"
+    }
+    client.post("/api/v1/auth/register", json={
+        "username": f"stress{index}", **credentials
+    })
+    token = client.post("/api/v1/auth/login", json=credentials).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+    habit_ids = [
+        client.post("/api/v1/habits", json={
+            "name": name, "frequency": "daily"
+        }, headers=headers).json["id"]
+        for name in ("Run", "Read")
+    ]
+    return token, habit_ids
+
+
+@pytest.mark.parametrize("processes, threads", [
+    (1, THREADS * PROCESSES),
+    (PROCESSES, THREADS),
+], ids=["threads", "processes"])
+def test_concurrent_duplicate_and_cross_user_writes(
+    stress_app, processes, threads
+):
+    app, database_url = stress_app
+    client = app.test_client()
+    users = [_register(client, index) for index in range(USERS)]
+    db.session.remove()
+    plan = build_plan(users)
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes * threads)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=fire,
+            args=(database_url, plan, threads, barrier, results)
+        )
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    outcomes = [
+        outcome for _ in workers for outcome in results.get(timeout=300)
+    ]
+    for process in workers:
+        process.join()
+        assert process.exitcode == 0
+
+    responses = [response for *_, seen in outcomes for response in seen]
+    elapsed = max(end for _, end, _ in outcomes) - min(
+        start for start, _, _ in outcomes
+    )
+    statuses = Counter(status for _, status, _ in responses)
+    print(
+        f"\n{processes} process(es) x {threads} thread(s): "
+        f"{len(responses)} writes in {elapsed:.2f}s "
+        f"({len(responses) / elapsed:.0f}/s) {dict(statuses)}"
+    )
+    unexpected = [
+        (path, status) for path, status, allowed in responses
+        if status not in allowed
+    ]
+    assert unexpected == []
+
+    # Exactly one winner per (habit, day) and (user, day); cross-user
+    # writes never created anything
+    habit_ids = [habit_id for _, ids in users for habit_id in ids]
+    assert HabitLog.query.count() == len(habit_ids) * ROUNDS
+    assert MoodLog.query.count() == USERS * ROUNDS
+    assert db.session.query(HabitLog.habit_id, HabitLog.log_date).group_by(
+        HabitLog.habit_id, HabitLog.log_date
+    ).having(func.count() > 1).all() == []
+    assert statuses[201] == (len(habit_ids) + USERS) * ROUNDS
+    # Completion counters and streaks survived the contention
+    assert reconcile_habit_stats() == 0
@@ -1,2 +1,294 @@
 import pytest  # noqa: F401
-from app.models import db, User, Habit  # noqa: F401
+from datetime import date
+from sqlalchemy import event
+from app.models import db, User, Habit, HabitLog  # noqa: F401
+
+
+@pytest.fixture
+def auth_client(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "habituser",
+            "email": "habit@example.com",
+            "password": "habitpassword"
+        }
+    )
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "habit@example.com", "password": "habitpassword"}
+    )
+    return client, {'Authorization': f'Bearer {response.json["token"]}'}
+
+
+def _track(client, headers, habit_id, log_date):
+    return client.post(
+        f"/api/v1/habits/{habit_id}/track",
+        json={"habit_id": habit_id, "log_date": log_date},
+        headers=headers
+    )
+
+
+def test_track_habit_maintains_completion_stats(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Run", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+
+    for log_date in ["2025-09-01", "2025-09-02", "2025-09-04"]:
+        assert _track(client, headers, habit_id, log_date).status_code == 201
+
+    habit = client.get("/api/v1/habits", headers=headers).json[0]
+    assert habit["total_completions"] == 3
+    assert habit["last_log_date"] == "2025-09-04"
+    assert habit["current_streak"] == 1
+
+    # Backfilling the gap joins both runs into one streak
+    assert _track(client, headers, habit_id, "2025-09-03").status_code == 201
+    habit = client.get(f"/api/v1/habits/{habit_id}", headers=headers).json
+    assert habit["total_completions"] == 4
+    assert habit["last_log_date"] == "2025-09-04"
+    assert habit["current_streak"] == 4
+
+
+def test_track_habit_not_found(auth_client):
+    client, headers = auth_client
+    response = _track(client, headers, 999, "2025-09-01")
+    assert response.status_code == 404
+
+
+def test_reconcile_habit_stats_repairs_drift(auth_client):
+    client, headers = auth_client
+    drifted, healthy = [
+        client.post(
+            "/api/v1/habits",
+            json={"name": name, "frequency": "daily"},
+            headers=headers
+        ).json["id"]
+        for name in ("Run", "Read")
+    ]
+    for habit_id in (drifted, healthy):
+        _track(client, headers, habit_id, "2025-09-01")
+        _track(client, headers, habit_id, "2025-09-02")
+
+    habit = db.session.get(Habit, drifted)
+    habit.total_completions = 42
+    habit.last_log_date = date(2025, 8, 1)
+    habit.current_streak = 0
+    db.session.commit()
+
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=["reconcile-habit-stats"])
+    assert result.exit_code == 0
+    assert result.output.strip() == "已修正 1 個習慣的完成統計。"
+
+    db.session.expire_all()
+    for habit_id in (drifted, healthy):
+        habit = db.session.get(Habit, habit_id)
+        assert (
+            habit.total_completions, habit.last_log_date,
+            habit.current_streak
+        ) == (2, date(2025, 9, 2), 2)
+
+    result = runner.invoke(args=["reconcile-habit-stats"])
+    assert result.output.strip() == "已修正 0 個習慣的完成統計。"
+
+
+def test_delete_habit_cascades_in_database(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Run", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+    for day in range(1, 6):
+        _track(client, headers, habit_id, f"2025-09-0{day}")
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", capture)
+    try:
+        response = client.delete(
+            f"/api/v1/habits/{habit_id}", headers=headers
+        )
+    finally:
+        event.remove(db.engine, "before_cursor_execute", capture)
+
+    assert response.status_code == 204
+    assert HabitLog.query.count() == 0
+    # The logs are removed by ON DELETE CASCADE, never read, loaded or
+    # deleted one by one; the habit's sync tombstone covers them
+    assert not [sql for sql in statements if "habit_logs" in sql]
+
+
+def test_create_habit_retry_with_idempotency_key(auth_client):
+    client, headers = auth_client
+    headers = {**headers, 'Idempotency-Key': 'onboarding-read'}
+    body = {"name": "Read", "frequency": "daily"}
+
+    first = client.post("/api/v1/habits", json=body, headers=headers)
+    retry = client.post("/api/v1/habits", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json["id"] == first.json["id"]
+    assert Habit.query.count() == 1
+
+    track_headers = {**headers, 'Idempotency-Key': 'track-2025-09-01'}
+    for _ in range(2):
+        response = client.post(
+            f"/api/v1/habits/{first.json['id']}/track",
+            json={"habit_id": first.json["id"], "log_date": "2025-09-01"},
+            headers=track_headers
+        )
+        assert response.status_code == 201
+    assert HabitLog.query.count() == 1
+
+
+def test_update_habit(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+
+    response = client.put(
+        f"/api/v1/habits/{habit_id}",
+        json={"name": "Read 30 minutes", "user_id": 999},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json["name"] == "Read 30 minutes"
+    assert db.session.get(Habit, habit_id).user_id == 1
+
+
+def test_habit_batch_create_update_delete(auth_client):
+    client, headers = auth_client
+    response = client.post(
+        "/api/v1/habits/batch",
+        json=[
+            {"name": f"Habit {i}", "frequency": "daily"} for i in range(10)
+        ],
+        headers=headers
+    )
+    assert response.status_code == 201
+    assert [item["status"] for item in response.json] == [201] * 10
+    ids = [item["habit"]["id"] for item in response.json]
+
+    response = client.patch(
+        "/api/v1/habits/batch",
+        json=[{"id": habit_id, "frequency": "weekly"} for habit_id in ids],
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert {item["habit"]["frequency"] for item in response.json} == {
+        "weekly"
+    }
+
+    response = client.delete(
+        "/api/v1/habits/batch", json={"ids": ids[:5]}, headers=headers
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json] == ids[:5]
+    assert Habit.query.count() == 5
+
+
+def test_habit_batch_is_all_or_nothing(auth_client):
+    client, headers = auth_client
+    response = client.post(
+        "/api/v1/habits/batch",
+        json=[{"name": "Ok", "frequency": "daily"}, {"name": "No freq"}],
+        headers=headers
+    )
+    assert response.status_code == 422
+    assert response.json["errors"][0]["index"] == 1
+    assert "frequency" in response.json["errors"][0]["errors"]
+    assert Habit.query.count() == 0
+
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+    response = client.patch(
+        "/api/v1/habits/batch",
+        json=[
+            {"id": habit_id, "name": "Renamed"},
+            {"id": 999, "name": "Not mine"},
+        ],
+        headers=headers
+    )
+    assert response.status_code == 422
+    assert response.json["errors"] == [{
+        "index": 1, "id": 999, "status": 404, "message": "Habit not found"
+    }]
+    assert db.session.get(Habit, habit_id).name == "Read"
+
+
+def test_create_cannot_take_over_another_users_habit(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+
+    client.post("/api/v1/auth/register", json={
+        "username": "bob", "email": "bob@example.com",
+        "password": "bobpassword"
+    })
+    token = client.post("/api/v1/auth/login", json={
+        "email": "bob@example.com", "password": "bobpassword"
+    }).json["token"]
+    bob = {'Authorization': f'Bearer {token}'}
+
+    body = {"id": habit_id, "name": "Mine now", "frequency": "daily"}
+    single = client.post("/api/v1/habits", json=body, headers=bob)
+    batch = client.post("/api/v1/habits/batch", json=[body], headers=bob)
+    assert single.status_code == batch.status_code == 201
+    # Both requests created new habits instead of loading the existing row
+    assert single.json["id"] != habit_id
+    assert batch.json[0]["habit"]["id"] != habit_id
+
+    habit = db.session.get(Habit, habit_id)
+    assert habit.user_id == 1
+    assert habit.name == "Read"
+    assert Habit.query.count() == 3
+
+
+def test_habit_batch_rejects_non_integer_ids(auth_client):
+    client, headers = auth_client
+    response = client.delete(
+        "/api/v1/habits/batch", json={"ids": [[1]]}, headers=headers
+    )
+    assert response.status_code == 400
+    response = client.patch(
+        "/api/v1/habits/batch", json=[{"id": "1", "name": "x"}],
+        headers=headers
+    )
+    assert response.status_code == 400
+
+
+def test_non_object_bodies_are_rejected_as_invalid_input(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+    for body in ("null", "[1]", '"Read"'):
+        response = client.put(
+            f"/api/v1/habits/{habit_id}", data=body,
+            content_type="application/json", headers=headers
+        )
+        assert response.status_code == 422, body
+        assert response.json == {"_schema": ["Invalid input type."]}
+        response = client.post(
+            "/api/v1/habits", data=body,
+            content_type="application/json", headers=headers
+        )
+        assert response.status_code == 422, body
@@ -0,0 +1,165 @@
+import pytest
+import numpy as np
+from datetime import date, timedelta
+
+from app import forecast
+from app.forecast import forecast_cache, MIN_SAMPLES
+
+
+@pytest.fixture
+def auth_client(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "insightuser",
+            "email": "insight@example.com",
+            "password": "insightpassword"
+        }
+    )
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "insight@example.com", "password": "insightpassword"}
+    )
+    return client, {'Authorization': f'Bearer {response.json["token"]}'}
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    # Record every full refit so tests can tell them from rank-one updates
+    calls = []
+    load_model = forecast._load_model
+
+    def counting_load_model(user_id, habit_ids):
+        calls.append(user_id)
+        return load_model(user_id, habit_ids)
+
+    monkeypatch.setattr(forecast, "_load_model", counting_load_model)
+    return calls
+
+
+def _habit(client, headers, name):
+    return client.post(
+        "/api/v1/habits", json={"name": name, "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+
+
+def _track(client, headers, habit_id, log_date):
+    response = client.post(
+        f"/api/v1/habits/{habit_id}/track",
+        json={"habit_id": habit_id, "log_date": log_date.isoformat()},
+        headers=headers
+    )
+    assert response.status_code == 201
+
+
+def _mood(client, headers, log_date, rating):
+    response = client.post(
+        "/api/v1/moods",
+        json={"rating": rating, "log_date": log_date.isoformat()},
+        headers=headers
+    )
+    assert response.status_code == 201
+
+
+def _forecast(client, headers, **params):
+    return client.get(
+        "/api/v1/insights/forecast", query_string=params, headers=headers
+    )
+
+
+def _history(client, headers, start, days):
+    """Moods are 2 on plain days and 4 on days the first habit is done."""
+    run, read = _habit(client, headers, "Run"), _habit(client, headers, "Read")
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        # Runs come in pairs so the habit is not collinear with lagged mood
+        done = offset // 2 % 2 == 0
+        if done:
+            _track(client, headers, run, day)
+        if offset % 3 == 0:
+            _track(client, headers, read, day)
+        _mood(client, headers, day, 4 if done else 2)
+    return run, read
+
+
+def test_forecast_needs_enough_data(auth_client):
+    client, headers = auth_client
+    _mood(client, headers, date(2025, 1, 1), 3)
+    response = _forecast(client, headers)
+    assert response.status_code == 422
+    assert str(MIN_SAMPLES) in response.json["message"]
+
+
+def test_forecast_without_any_moods(auth_client):
+    client, headers = auth_client
+    _habit(client, headers, "Run")
+    response = _forecast(client, headers)
+    assert response.status_code == 422
+    assert forecast_cache._models == {}
+
+
+def test_forecast_estimates_habit_effects(auth_client):
+    client, headers = auth_client
+    run, read = _history(client, headers, date(2025, 1, 1), 40)
+
+    response = _forecast(client, headers, habit_id=run)
+    assert response.status_code == 200
+    assert response.json["samples"] == 40
+    effects = {h["habit_id"]: h["effect"] for h in response.json["habits"]}
+    assert effects[run] > 1.5
+    assert abs(effects[read]) < 0.5
+    assert response.json["predicted"] > response.json["baseline"] + 1.5
+
+    assert _forecast(client, headers, habit_id=999).status_code == 404
+
+
+def test_rank_one_updates_match_a_full_refit(auth_client, fits):
+    client, headers = auth_client
+    start = date(2025, 1, 1)
+    run, read = _history(client, headers, start, 20)
+    assert _forecast(client, headers).status_code == 200
+    assert len(fits) == 1
+
+    # Appended mood, a backfilled mood whose next day already has a mood,
+    # and completions on days with and without a mood log
+    _mood(client, headers, start + timedelta(days=25), 5)
+    _mood(client, headers, start + timedelta(days=24), 1)
+    _track(client, headers, read, start + timedelta(days=1))
+    _track(client, headers, run, start + timedelta(days=30))
+    _track(client, headers, read, start + timedelta(days=24))
+
+    response = _forecast(client, headers)
+    assert response.status_code == 200
+    assert len(fits) == 1
+    assert response.json["samples"] == 22
+
+    user_id, cached = next(iter(forecast_cache._models.items()))
+    refit = forecast._load_model(user_id, cached.habit_ids)
+    assert np.allclose(cached.coef, refit.coef)
+    assert np.allclose(cached.a_inv, refit.a_inv)
+
+
+def test_other_changes_invalidate_the_cached_model(auth_client, fits):
+    client, headers = auth_client
+    start = date(2025, 1, 1)
+    _history(client, headers, start, 10)
+    assert _forecast(client, headers).status_code == 200
+
+    mood_id = client.get("/api/v1/moods", headers=headers).json[0]["id"]
+    client.put(f"/api/v1/moods/{mood_id}", json={"rating": 5}, headers=headers)
+    assert _forecast(client, headers).status_code == 200
+    assert len(fits) == 2
+
+    # A new habit adds a feature column, so the model is refit as well
+    _habit(client, headers, "Meditate")
+    response = _forecast(client, headers)
+    assert len(fits) == 3
+    assert len(response.json["habits"]) == 3
+
+
+def test_forecast_rejects_malformed_habit_ids(auth_client):
+    client, headers = auth_client
+    response = _forecast(client, headers, habit_id="abc")
+    assert response.status_code == 400
+    assert "habit_id" in response.json
@@ -0,0 +1,250 @@
+import threading
+import time
+
+import pytest
+from marshmallow import Schema, fields
+from app import create_app
+from app.extensions import db
+from app.jobs import (
+    job_queue, job_handler, make_dedup_key, JobQueue, JOB_HANDLERS,
+    JOB_PARAMS_SCHEMAS
+)
+from app.models import Job, User
+from tests.conftest import TestConfig
+
+
+@pytest.fixture
+def auth_client(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "jobuser",
+            "email": "job@example.com",
+            "password": "jobpassword"
+        }
+    )
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "job@example.com", "password": "jobpassword"}
+    )
+    return client, response.json["token"]
+
+
+def test_export_job_runs_and_returns_result(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        "/api/v1/moods",
+        json={"rating": 4, "notes": "ok", "log_date": "2025-09-01"},
+        headers=headers
+    )
+
+    response = client.post(
+        "/api/v1/jobs", json={"kind": "export"}, headers=headers
+    )
+    assert response.status_code == 202
+    job_id = response.json["id"]
+
+    response = client.get(f"/api/v1/jobs/{job_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json["status"] == "succeeded"
+    assert response.json["result"]["moods"] == [
+        {"log_date": "2025-09-01", "rating": 4, "notes": "ok"}
+    ]
+
+
+def test_identical_pending_job_is_deduplicated(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    pending = Job(
+        user_id=1, kind="export", params={},
+        dedup_key=make_dedup_key("export", {})
+    )
+    db.session.add(pending)
+    db.session.commit()
+
+    response = client.post(
+        "/api/v1/jobs", json={"kind": "export"}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json["id"] == pending.id
+    assert Job.query.count() == 1
+
+
+def test_create_job_invalid_kind(auth_client):
+    client, token = auth_client
+    response = client.post(
+        "/api/v1/jobs",
+        json={"kind": "mine-bitcoin"},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 400
+    assert "kind" in response.json
+
+
+def test_identical_concurrent_submit_is_deduplicated(
+    auth_client, monkeypatch
+):
+    client, token = auth_client
+    lookup = JobQueue._active_job
+    competing = []
+
+    def racing_lookup(user_id, dedup_key):
+        # Another request inserts the same job between check and insert
+        if not competing:
+            competing.append(Job(
+                user_id=user_id, kind="export", params={},
+                dedup_key=dedup_key
+            ))
+            db.session.add(competing[0])
+            db.session.commit()
+            return None
+        return lookup(user_id, dedup_key)
+
+    monkeypatch.setattr(JobQueue, "_active_job", staticmethod(racing_lookup))
+    response = client.post(
+        "/api/v1/jobs", json={"kind": "export"},
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 200
+    assert response.json["id"] == competing[0].id
+    assert Job.query.count() == 1
+
+
+def test_create_job_validates_params_per_kind(auth_client, recorded):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    response = client.post(
+        "/api/v1/jobs", json={"kind": "export", "params": {"year": 2025}},
+        headers=headers
+    )
+    assert response.status_code == 400
+    assert "year" in response.json["params"]
+
+    response = client.post(
+        "/api/v1/jobs", json={"kind": "test-record", "params": {}},
+        headers=headers
+    )
+    assert response.status_code == 400
+    assert "name" in response.json["params"]
+    assert Job.query.count() == 0
+
+    response = client.post(
+        "/api/v1/jobs",
+        json={"kind": "test-record", "params": {"name": "ok"}},
+        headers=headers
+    )
+    assert response.status_code == 202
+    assert response.json["result"] == "ok"
+
+
+def test_get_job_not_found(auth_client):
+    client, token = auth_client
+    response = client.get(
+        "/api/v1/jobs/999",
+        headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def threaded_app(tmp_path):
+    """An app whose jobs run on real worker threads against a file database."""
+    config = type('ThreadedJobsConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'jobs.db'}",
+        'JOBS_RUN_INLINE': False,
+        'JOBS_MAX_WORKERS': 1,
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.session.add(User(
+            username="worker", email="worker@example.com", password_hash="x"
+        ))
+        db.session.commit()
+        yield app
+        job_queue.shutdown()
+        db.session.remove()
+        db.engine.dispose()
+
+
+class RecordParamsSchema(Schema):
+    name = fields.Str(required=True)
+
+
+@pytest.fixture
+def recorded():
+    """Register a job kind that records the order jobs run in."""
+    ran = []
+    release = threading.Event()
+    release.set()
+
+    @job_handler("test-record", RecordParamsSchema())
+    def record(user_id, name):
+        release.wait(timeout=10)
+        ran.append(name)
+        return name
+
+    yield ran, release
+    release.set()
+    JOB_HANDLERS.pop("test-record")
+    JOB_PARAMS_SCHEMAS.pop("test-record")
+
+
+def _pending(name, priority=0):
+    return Job(
+        user_id=1, kind="test-record", params={"name": name},
+        dedup_key=make_dedup_key("test-record", {"name": name}),
+        priority=priority
+    )
+
+
+def _wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def _statuses():
+    db.session.expire_all()
+    return {
+        job.params["name"]: job.status for job in Job.query.order_by(Job.id)
+    }
+
+
+def test_pending_jobs_resume_at_startup_in_priority_order(
+    threaded_app, recorded
+):
+    ran, _ = recorded
+    # Left over from a previous process
+    db.session.add_all([
+        _pending("low", -1), _pending("normal"), _pending("high", 5)
+    ])
+    db.session.commit()
+
+    # Any request starts the workers; no new job has to be submitted
+    threaded_app.test_client().get("/openapi.yml")
+    _wait_for(lambda: len(ran) == 3)
+    assert ran == ["high", "normal", "low"]
+    _wait_for(lambda: set(_statuses().values()) == {"succeeded"})
+
+
+def test_shutdown_leaves_queued_jobs_pending(threaded_app, recorded):
+    ran, release = recorded
+    release.clear()
+    job_queue.submit(1, "test-record", {"name": "first"})
+    # The single worker is now blocked inside the first job
+    _wait_for(lambda: _statuses()["first"] == "running")
+    for name in ("second", "third"):
+        job_queue.submit(1, "test-record", {"name": name})
+
+    workers = list(job_queue._threads)
+    job_queue.shutdown(wait=False)
+    release.set()
+    for worker in workers:
+        worker.join(timeout=10)
+
+    assert ran == ["first"]
+    assert _statuses() == {
+        "first": "succeeded", "second": "pending", "third": "pending"
+    }
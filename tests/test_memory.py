@@ -0,0 +1,55 @@
+"""tracemalloc benchmark for the read-only row path used by GET handlers.
+
+Each case loads the same rows through full ORM instances and through
+app.readonly.select_rows, serializes them with the handler's schema, and
+compares peak allocations. Run with -s to see the numbers, and scale the
+data with the SEED_* variables described in conftest.large_dataset.
+"""
+import gc
+import tracemalloc
+
+import pytest
+from app.api.habits import habits_schema
+from app.api.moods import mood_logs_schema
+from app.extensions import db
+from app.models import Habit, MoodLog
+from app.readonly import select_rows
+
+
+def peak_allocation(load):
+    db.session.remove()
+    load()  # warm caches (compiled statements, schema internals)
+    db.session.remove()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        load()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        db.session.remove()
+
+
+@pytest.mark.parametrize("model, schema", [
+    (MoodLog, mood_logs_schema),
+    (Habit, habits_schema),
+])
+def test_slim_rows_allocate_less_than_orm_instances(
+    large_dataset, model, schema
+):
+    criteria = (model.user_id <= 10,)
+
+    def orm():
+        return schema.dump(model.query.filter(*criteria).all())
+
+    def slim():
+        return schema.dump(select_rows(schema, model, *criteria).all())
+
+    assert orm() == slim()
+    orm_peak, slim_peak = peak_allocation(orm), peak_allocation(slim)
+    print(
+        f"\n{model.__tablename__}: ORM {orm_peak / 1024:.0f} KiB, "
+        f"slim rows {slim_peak / 1024:.0f} KiB "
+        f"({1 - slim_peak / orm_peak:.0%} less)"
+    )
+    assert slim_peak < orm_peak * 0.8
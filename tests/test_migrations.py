@@ -0,0 +1,77 @@
+import os
+import shutil
+import sqlite3
+
+from flask_migrate import upgrade
+from sqlalchemy import inspect
+
+from app import create_app
+from app.extensions import db
+from tests.conftest import TestConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_upgrade_brings_a_baseline_database_up_to_date(tmp_path):
+    # The committed development database predates the timezone and
+    # completion-stat columns, the summary index and the cascades
+    path = tmp_path / "app.db"
+    shutil.copy(os.path.join(ROOT, "instance", "app.db"), path)
+    with sqlite3.connect(path) as connection:
+        user_id, = connection.execute("SELECT id FROM users").fetchone()
+        connection.execute(
+            "INSERT INTO habits (id, user_id, name, frequency, created_at) "
+            "VALUES (1, ?, 'Run', 'daily', '2025-01-01')", (user_id,)
+        )
+        connection.executemany(
+            "INSERT INTO habit_logs (habit_id, log_date, value, created_at) "
+            "VALUES (1, ?, 1, '2025-01-01')",
+            [("2025-01-01",), ("2025-01-03",), ("2025-01-04",)]
+        )
+
+    config = type('MigrationConfig', (TestConfig,), {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{path}"
+    })
+    app = create_app(config)
+    with app.app_context():
+        upgrade(directory=os.path.join(ROOT, "migrations"))
+        columns = {
+            table: {c['name'] for c in inspect(db.engine).get_columns(table)}
+            for table in ('users', 'habits', 'habit_logs', 'mood_logs')
+        }
+        indexes = {
+            index['name'] for index in inspect(db.engine).get_indexes(
+                'mood_logs'
+            )
+        }
+        cascades = {
+            table: [
+                fk['options'].get('ondelete')
+                for fk in inspect(db.engine).get_foreign_keys(table)
+            ]
+            for table in ('habits', 'habit_logs', 'mood_logs')
+        }
+        stats = db.session.execute(db.text(
+            "SELECT total_completions, last_log_date, current_streak "
+            "FROM habits"
+        )).one()
+        db.session.remove()
+        db.engine.dispose()
+
+    assert 'timezone' in columns['users']
+    assert 'total_completions' in columns['habits']
+    assert 'ix_mood_logs_user_log_date_rating' in indexes
+    assert cascades == {
+        table: ['CASCADE'] for table in ('habits', 'habit_logs', 'mood_logs')
+    }
+    assert tuple(stats) == (3, '2025-01-04', 2)
+
+    client = app.test_client()
+    credentials = {"email": "new@example.com", "password": "password123"}
+    response = client.post("/api/v1/auth/register", json={
+        "username": "newuser", **credentials
+    })
+    assert response.status_code == 201
+    assert client.post(
+        "/api/v1/auth/login", json=credentials
+    ).status_code == 200
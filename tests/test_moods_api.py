@@ -1,7 +1,8 @@
 import pytest  # noqa: F401
-from app.models import MoodLog
-from datetime import date, timedelta
+from app.models import MoodLog, User
+from datetime import date, datetime, timedelta, UTC
 from app.extensions import db
+from app.search import create_search_index, search_mood_notes
 
 
 @pytest.fixture
@@ -240,3 +241,200 @@ def test_unauthorized_access_moods(client):
         "/api/v1/moods",
     )
     assert response.status_code == 401
+
+
+def test_mood_summary_by_week_and_month(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    # 2025-09-01 is a Monday
+    for log_date, rating in [
+        ("2025-09-01", 2), ("2025-09-03", 4), ("2025-09-08", 5),
+        ("2025-10-02", 3),
+    ]:
+        client.post(
+            "/api/v1/moods",
+            json={"rating": rating, "log_date": log_date},
+            headers=headers
+        )
+    habit = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json
+    client.post(
+        f"/api/v1/habits/{habit['id']}/track",
+        json={"habit_id": habit['id'], "log_date": "2025-09-02"},
+        headers=headers
+    )
+
+    response = client.get(
+        "/api/v1/moods/summary?bucket=week&from=2025-09-01&to=2025-09-30",
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json == [
+        {"bucket": "2025-09-01", "mood_count": 2, "avg_rating": 3.0,
+         "min_rating": 2, "max_rating": 4, "habit_completions": 1},
+        {"bucket": "2025-09-08", "mood_count": 1, "avg_rating": 5.0,
+         "min_rating": 5, "max_rating": 5, "habit_completions": 0},
+    ]
+
+    response = client.get(
+        "/api/v1/moods/summary?bucket=month", headers=headers
+    )
+    assert response.status_code == 200
+    assert [row["bucket"] for row in response.json] == [
+        "2025-09-01", "2025-10-01"
+    ]
+    assert response.json[0]["mood_count"] == 3
+    assert response.json[0]["habit_completions"] == 1
+
+    response = client.get(
+        "/api/v1/moods/summary?bucket=day", headers=headers
+    )
+    assert response.status_code == 400
+    assert "bucket" in response.json
+
+    response = client.get(
+        "/api/v1/moods/summary?from=2025-13-01", headers=headers
+    )
+    assert response.status_code == 400
+    assert "from" in response.json
+
+
+def test_search_mood_notes(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    notes = [
+        ("2025-09-01", "Slept badly, too much coffee"),
+        ("2025-09-02", "Great sleep after yoga"),
+        ("2025-09-03", "昨晚睡眠品質很好"),
+        ("2025-09-04", "Busy day at work"),
+    ]
+    ids = {}
+    for log_date, note in notes:
+        ids[log_date] = client.post(
+            "/api/v1/moods",
+            json={"rating": 3, "notes": note, "log_date": log_date},
+            headers=headers
+        ).json["id"]
+
+    response = client.get("/api/v1/moods/search?q=sleep", headers=headers)
+    assert response.status_code == 200
+    assert [item["log_date"] for item in response.json["items"]] == [
+        "2025-09-02"
+    ]
+    assert "<mark>sleep</mark>" in response.json["items"][0]["snippet"]
+    assert response.json["has_more"] is False
+
+    response = client.get("/api/v1/moods/search?q=睡眠品", headers=headers)
+    assert [item["log_date"] for item in response.json["items"]] == [
+        "2025-09-03"
+    ]
+
+    # Index stays in sync with updates and deletes
+    client.put(
+        f"/api/v1/moods/{ids['2025-09-04']}",
+        json={"notes": "Needed more sleep"},
+        headers=headers
+    )
+    client.delete(f"/api/v1/moods/{ids['2025-09-02']}", headers=headers)
+    response = client.get(
+        "/api/v1/moods/search?q=sleep&per_page=1", headers=headers
+    )
+    assert [item["log_date"] for item in response.json["items"]] == [
+        "2025-09-04"
+    ]
+    assert response.json["has_more"] is False
+
+    response = client.get("/api/v1/moods/search?q=ab", headers=headers)
+    assert response.status_code == 400
+
+    # Out-of-range paging is rejected rather than clamped
+    for params in ("per_page=500", "per_page=0", "page=0", "page=x"):
+        response = client.get(
+            f"/api/v1/moods/search?q=sleep&{params}", headers=headers
+        )
+        assert response.status_code == 400, params
+        assert params.split("=")[0] in response.json
+
+
+def test_create_mood_idempotency_key_replays_response(auth_client):
+    client, token = auth_client
+    headers = {
+        'Authorization': f'Bearer {token}',
+        'Idempotency-Key': 'mood-2025-09-01'
+    }
+    body = {"rating": 4, "notes": "retry me", "log_date": "2025-09-01"}
+
+    first = client.post("/api/v1/moods", json=body, headers=headers)
+    retry = client.post("/api/v1/moods", json=body, headers=headers)
+    assert first.status_code == retry.status_code == 201
+    assert retry.json == first.json
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert MoodLog.query.count() == 1
+
+    # Reusing the key for a different request is rejected
+    response = client.post(
+        "/api/v1/moods", json={**body, "rating": 2}, headers=headers
+    )
+    assert response.status_code == 422
+
+
+def test_search_is_scoped_to_the_user(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    # User ids 4 and 42 share a prefix; the owner token must not mix them
+    db.session.add_all(
+        User(id=user_id, username=f"other{user_id}",
+             email=f"other{user_id}@example.com", password_hash="x")
+        for user_id in (4, 42)
+    )
+    db.session.add_all(
+        MoodLog(user_id=user_id, rating=2, notes="No sleep",
+                log_date=date(2025, 9, 1))
+        for user_id in (4, 42)
+    )
+    db.session.commit()
+    mood_id = client.post(
+        "/api/v1/moods",
+        json={"rating": 4, "notes": "Good sleep", "log_date": "2025-09-01"},
+        headers=headers
+    ).json["id"]
+
+    response = client.get("/api/v1/moods/search?q=sleep", headers=headers)
+    assert [item["id"] for item in response.json["items"]] == [mood_id]
+    assert len(search_mood_notes(4, "sleep", limit=10)) == 1
+
+    # Rebuilding the index (as the migration does) keeps the scoping
+    create_search_index(db.session.connection(), rebuild=True)
+    db.session.commit()
+    response = client.get("/api/v1/moods/search?q=sleep", headers=headers)
+    assert [item["id"] for item in response.json["items"]] == [mood_id]
+    assert len(search_mood_notes(42, "sleep", limit=10)) == 1
+
+
+def test_mood_log_keeps_the_users_calendar_day(auth_client):
+    client, token = auth_client
+    headers = {'Authorization': f'Bearer {token}'}
+    started = datetime.now(UTC).replace(tzinfo=None)
+    # UTC+14: the local day differs from the UTC day for ten hours a day
+    client.patch(
+        "/api/v1/users/me", json={"timezone": "Pacific/Kiritimati"},
+        headers=headers
+    )
+    for log_date in ("2025-01-01", "2025-01-02"):
+        response = client.post(
+            "/api/v1/moods",
+            json={"rating": 3, "log_date": log_date},
+            headers=headers
+        )
+        assert response.status_code == 201
+
+    first, second = MoodLog.query.order_by(MoodLog.id).all()
+    # created_at is stamped per row, not once at import time
+    assert started <= first.created_at <= second.created_at
+    # log_date is the day on the user's calendar, not shifted to UTC
+    assert second.log_date == date(2025, 1, 2)
+    assert response.json["log_date"] == "2025-01-02"
+    assert "local_date" not in response.json
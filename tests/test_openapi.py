@@ -0,0 +1,122 @@
+import gzip
+
+import pytest  # noqa: F401
+import yaml
+from flask import current_app
+
+from app import openapi
+
+
+def _spec(client):
+    response = client.get("/openapi.yml")
+    assert response.status_code == 200
+    return yaml.safe_load(response.data)
+
+
+def test_spec_covers_every_api_route(client):
+    spec = _spec(client)
+    documented = {
+        (path, method.upper())
+        for path, operations in spec["paths"].items()
+        for method in operations
+    }
+    for rule in current_app.url_map.iter_rules():
+        if not rule.rule.startswith("/api/v1"):
+            continue
+        path = openapi._RULE_ARGUMENT.sub(r"{\2}", rule.rule)
+        for method in rule.methods - {"HEAD", "OPTIONS"}:
+            assert (path, method) in documented
+
+    track = spec["paths"]["/api/v1/habits/{habit_id}/track"]["post"]
+    assert track["parameters"][0]["schema"]["type"] == "integer"
+    assert "201" in track["responses"]
+    assert track["security"] == [{"BearerAuth": []}]
+    assert "security" not in spec["paths"]["/api/v1/auth/login"]["post"]
+
+
+def test_spec_schemas_match_validation(client):
+    habit = _spec(client)["components"]["schemas"]["Habit"]
+    # Fields the handlers refuse to load are documented as read-only
+    for field in ("total_completions", "last_log_date", "current_streak"):
+        assert habit["properties"][field]["readOnly"] is True
+    assert set(habit["required"]) == {"name", "frequency"}
+
+    response = client.post("/api/v1/auth/register", json={"username": "x"})
+    assert response.status_code == 400
+    assert set(response.json) == {"email", "password"}
+
+
+def test_spec_is_built_once_and_cached(client, monkeypatch):
+    calls = []
+    build_spec = openapi.build_spec
+
+    def counting_build_spec(flask_app):
+        calls.append(flask_app)
+        return build_spec(flask_app)
+
+    monkeypatch.setattr(openapi, "build_spec", counting_build_spec)
+    first = client.get("/openapi.yml")
+    second = client.get("/openapi.yml")
+    assert len(calls) == 1
+    assert first.data == second.data
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert "max-age=86400" in first.headers["Cache-Control"]
+
+    response = client.get(
+        "/openapi.yml", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_spec_gzip_variant(client):
+    plain = client.get("/openapi.yml")
+    response = client.get(
+        "/openapi.yml", headers={"Accept-Encoding": "gzip, deflate"}
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == plain.data
+    # Each representation has its own validator
+    assert response.headers["ETag"] != plain.headers["ETag"]
+
+
+def test_spec_documents_query_parameters_and_errors(client):
+    paths = _spec(client)["paths"]
+
+    def query_parameters(path, method="get"):
+        return {
+            p["name"]: p for p in paths[path][method]["parameters"]
+            if p["in"] == "query"
+        }
+
+    summary = query_parameters("/api/v1/moods/summary")
+    assert set(summary) == {"bucket", "from", "to"}
+    assert summary["bucket"]["schema"]["enum"] == ["week", "month"]
+    search = query_parameters("/api/v1/moods/search")
+    assert set(search) == {"q", "page", "per_page"}
+    assert search["q"]["required"] is True
+    assert set(query_parameters("/api/v1/sync")) == {"since"}
+    assert query_parameters("/api/v1/insights/forecast")["habit_id"][
+        "schema"
+    ]["type"] == "array"
+
+    track = paths["/api/v1/habits/{habit_id}/track"]["post"]
+    assert {"404", "409", "422"} <= set(track["responses"])
+    assert track["responses"]["404"]["content"]["application/json"][
+        "schema"
+    ] == {"$ref": "#/components/schemas/Error"}
+    assert "Idempotency-Key" in {p["name"] for p in track["parameters"]}
+
+    batch = paths["/api/v1/habits/batch"]
+    for method in ("patch", "delete"):
+        assert "requestBody" in batch[method]
+        assert "422" in batch[method]["responses"]
+    for path in ("/api/v1/moods/summary", "/api/v1/moods/search"):
+        assert "content" in paths[path]["get"]["responses"]["200"]
+
+    # A deduplicated submit answers 200 with the existing job
+    jobs = paths["/api/v1/jobs"]["post"]["responses"]
+    assert {"200", "202", "400"} <= set(jobs)
+    assert jobs["200"]["content"] == jobs["202"]["content"]
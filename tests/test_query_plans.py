@@ -0,0 +1,156 @@
+"""Query-plan and statement-budget regression tests for the hot endpoints.
+
+Every statement an endpoint sends to the database is captured and run
+through EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL, with sequential
+scans disabled so only an unusable index produces one). A full table scan or
+an extra statement fails the test.
+"""
+import json
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.models import User, Habit, MoodLog
+from app.seed import SEED_PASSWORD
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+@pytest.fixture
+def capture_sql(client):
+    """Record (statement, parameters) for every query executed while active."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def full_scans(statement, parameters):
+    """Return the plan steps of `statement` that read a whole table."""
+    if not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return []
+    connection = db.session.connection()
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        plan = connection.exec_driver_sql(
+            "EXPLAIN (FORMAT JSON) " + statement, parameters
+        ).scalar()
+        plan = json.loads(plan) if isinstance(plan, str) else plan
+        return [
+            node for node in _plan_nodes(plan[0]["Plan"])
+            if node["Node Type"] == "Seq Scan"
+        ]
+    rows = connection.exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + statement, parameters
+    ).all()
+    return [
+        row[3] for row in rows
+        if row[3].startswith("SCAN") and row[3] != "SCAN CONSTANT ROW"
+    ]
+
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def assert_indexed(statements, budget):
+    assert len(statements) <= budget, "\n".join(s for s, _ in statements)
+    for statement, parameters in statements:
+        assert full_scans(statement, parameters) == [], statement
+    db.session.rollback()
+
+
+@pytest.fixture
+def seeded_user(client, seed):
+    seed(users=5, habits_per_user=3, days=60)
+    user = User.query.order_by(User.id).first()
+    token = client.post(
+        "/api/v1/auth/login",
+        json={"email": user.email, "password": SEED_PASSWORD}
+    ).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+    # Warm up the per-process token denylist, which refreshes itself from
+    # the database only periodically, so budgets measure the steady state
+    client.get("/api/v1/users/me", headers=headers)
+    return user, headers
+
+
+def test_login_user_plan(client, seeded_user, capture_sql):
+    user, _ = seeded_user
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": user.email, "password": SEED_PASSWORD}
+    )
+    assert response.status_code == 200
+    assert_indexed(capture_sql, budget=1)
+
+
+def test_list_habits_plan(client, seeded_user, capture_sql):
+    _, headers = seeded_user
+    response = client.get("/api/v1/habits", headers=headers)
+    assert response.status_code == 200
+    assert_indexed(capture_sql, budget=1)
+
+
+def test_list_moods_plan(client, seeded_user, capture_sql):
+    _, headers = seeded_user
+    response = client.get("/api/v1/moods", headers=headers)
+    assert response.status_code == 200
+    assert_indexed(capture_sql, budget=1)
+
+
+def test_get_mood_plan(client, seeded_user, capture_sql):
+    user, headers = seeded_user
+    mood_id = db.session.query(MoodLog.id).filter_by(
+        user_id=user.id
+    ).first()[0]
+    capture_sql.clear()
+    response = client.get(f"/api/v1/moods/{mood_id}", headers=headers)
+    assert response.status_code == 200
+    assert_indexed(capture_sql, budget=1)
+
+
+def test_mood_summary_plan(client, seeded_user, capture_sql):
+    _, headers = seeded_user
+    capture_sql.clear()
+    response = client.get(
+        "/api/v1/moods/summary?from=2025-01-01&to=2025-03-01",
+        headers=headers
+    )
+    assert response.status_code == 200
+    statements = list(capture_sql)
+    # Both aggregates are range scans over the log_date indexes
+    assert_indexed(capture_sql, budget=2)
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        # COUNT(*) and the rating columns are read from the index alone
+        for statement, parameters in statements:
+            searches = [
+                row[3] for row in connection.exec_driver_sql(
+                    "EXPLAIN QUERY PLAN " + statement, parameters
+                ) if row[3].startswith("SEARCH")
+            ]
+            assert all("COVERING INDEX" in step for step in searches)
+
+
+def test_track_habit_plan(client, seeded_user, capture_sql):
+    user, headers = seeded_user
+    habit_id = db.session.query(Habit.id).filter_by(
+        user_id=user.id
+    ).first()[0]
+    capture_sql.clear()
+    response = client.post(
+        f"/api/v1/habits/{habit_id}/track",
+        json={"habit_id": habit_id, "log_date": "2026-01-01"},
+        headers=headers
+    )
+    assert response.status_code == 201
+    # write lock (BEGIN IMMEDIATE on SQLite), habit lock, counter update,
+    # insert, one change-log DELETE + INSERT and the post-commit reload;
+    # duplicates are left to the unique constraint instead of a pre-check
+    assert_indexed(capture_sql, budget=7)
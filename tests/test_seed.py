@@ -0,0 +1,50 @@
+import pytest  # noqa: F401
+from app.extensions import db
+from app.models import User, Habit, HabitLog, MoodLog
+from app.seed import SEED_PASSWORD
+
+
+def test_seed_is_deterministic(seed):
+    counts = seed(users=3, habits_per_user=2, days=30, seed=42)
+    first = [
+        (m.user_id, m.log_date, m.rating, m.notes)
+        for m in MoodLog.query.order_by(MoodLog.id)
+    ]
+    assert counts["users"] == User.query.count() == 3
+    assert counts["habits"] == Habit.query.count() == 6
+    assert counts["habit_logs"] == HabitLog.query.count()
+    assert counts["mood_logs"] == len(first)
+
+    db.drop_all()
+    db.create_all()
+    seed(users=3, habits_per_user=2, days=30, seed=42)
+    again = [
+        (m.user_id, m.log_date, m.rating, m.notes)
+        for m in MoodLog.query.order_by(MoodLog.id)
+    ]
+    assert again == first
+
+
+def test_large_dataset_is_usable_through_the_api(client, large_dataset):
+    assert large_dataset["users"] == User.query.count()
+    user = User.query.order_by(User.id).first()
+    token = client.post(
+        "/api/v1/auth/login",
+        json={"email": user.email, "password": SEED_PASSWORD}
+    ).json["token"]
+    headers = {'Authorization': f'Bearer {token}'}
+
+    habits = client.get("/api/v1/habits", headers=headers).json
+    for habit in habits:
+        # Seeded counters agree with the seeded logs
+        assert habit["total_completions"] == HabitLog.query.filter_by(
+            habit_id=habit["id"]
+        ).count()
+
+    response = client.get(
+        "/api/v1/moods/summary?bucket=month", headers=headers
+    )
+    assert response.status_code == 200
+    assert sum(row["mood_count"] for row in response.json) == (
+        MoodLog.query.filter_by(user_id=user.id).count()
+    )
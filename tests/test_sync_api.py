@@ -0,0 +1,190 @@
+import pytest  # noqa: F401
+from app.models import Habit, MoodLog
+
+
+@pytest.fixture
+def auth_client(client):
+    client.post(
+        "/api/v1/auth/register",
+        json={
+            "username": "syncuser",
+            "email": "sync@example.com",
+            "password": "syncpassword"
+        }
+    )
+    response = client.post(
+        "/api/v1/auth/login",
+        json={"email": "sync@example.com", "password": "syncpassword"}
+    )
+    return client, {'Authorization': f'Bearer {response.json["token"]}'}
+
+
+def test_full_sync_then_delta(auth_client):
+    client, headers = auth_client
+    habit = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json
+    mood = client.post(
+        "/api/v1/moods",
+        json={"rating": 3, "log_date": "2025-09-01"},
+        headers=headers
+    ).json
+
+    response = client.get("/api/v1/sync", headers=headers)
+    assert response.status_code == 200
+    assert [h["id"] for h in response.json["habits"]] == [habit["id"]]
+    assert [m["id"] for m in response.json["mood_logs"]] == [mood["id"]]
+    token = response.json["token"]
+
+    response = client.get(f"/api/v1/sync?since={token}", headers=headers)
+    assert response.json["habits"] == []
+    assert response.json["mood_logs"] == []
+    assert response.json["token"] == token
+
+    client.put(
+        f"/api/v1/moods/{mood['id']}", json={"rating": 5}, headers=headers
+    )
+    client.delete(f"/api/v1/habits/{habit['id']}", headers=headers)
+
+    response = client.get(f"/api/v1/sync?since={token}", headers=headers)
+    assert [m["rating"] for m in response.json["mood_logs"]] == [5]
+    assert response.json["habits"] == []
+    assert response.json["deleted"]["habits"] == [habit["id"]]
+    assert response.json["token"] > token
+
+
+def test_habit_tombstone_covers_its_logs(auth_client):
+    client, headers = auth_client
+    habit_ids = [
+        client.post(
+            "/api/v1/habits",
+            json={"name": name, "frequency": "daily"},
+            headers=headers
+        ).json["id"]
+        for name in ("Read", "Walk", "Swim")
+    ]
+    for habit_id in habit_ids:
+        client.post(
+            f"/api/v1/habits/{habit_id}/track",
+            json={"habit_id": habit_id, "log_date": "2025-09-01"},
+            headers=headers
+        )
+    token = client.get("/api/v1/sync", headers=headers).json["token"]
+
+    client.delete(f"/api/v1/habits/{habit_ids[0]}", headers=headers)
+    client.delete(
+        "/api/v1/habits/batch", json={"ids": habit_ids[1:]}, headers=headers
+    )
+
+    response = client.get(f"/api/v1/sync?since={token}", headers=headers)
+    deleted = response.json["deleted"]
+    assert sorted(deleted["habits"]) == habit_ids
+    # Clients drop a deleted habit's logs along with it
+    assert deleted["habit_logs"] == []
+    assert response.json["habit_logs"] == []
+
+
+def test_push_batch_applies_in_one_transaction(auth_client):
+    client, headers = auth_client
+    response = client.post(
+        "/api/v1/sync",
+        json={
+            "habits": [{"name": "Walk", "frequency": "daily"}],
+            "mood_logs": [
+                {"rating": 4, "log_date": "2025-09-01"},
+                {"rating": 2, "log_date": "2025-09-02"},
+            ],
+        },
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json["habits"][0]["name"] == "Walk"
+    assert len(response.json["mood_logs"]) == 2
+    mood_id = response.json["mood_logs"][0]["id"]
+
+    # A batch containing an invalid item leaves the database untouched
+    response = client.post(
+        "/api/v1/sync",
+        json={
+            "habits": [{"name": "Swim", "frequency": "daily"}],
+            "mood_logs": [{"id": mood_id, "rating": 9}],
+        },
+        headers=headers
+    )
+    assert response.status_code == 422
+    assert "mood_logs" in response.json
+    assert Habit.query.count() == 1
+
+    response = client.post(
+        "/api/v1/sync",
+        json={"deleted": {"mood_logs": [mood_id]}},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert MoodLog.query.count() == 1
+
+
+def test_push_reports_refreshed_habit_counters(auth_client):
+    client, headers = auth_client
+    habit_id = client.post(
+        "/api/v1/habits",
+        json={"name": "Read", "frequency": "daily"},
+        headers=headers
+    ).json["id"]
+    token = client.get("/api/v1/sync", headers=headers).json["token"]
+
+    response = client.post(
+        "/api/v1/sync",
+        json={"habit_logs": [
+            {"habit_id": habit_id, "log_date": "2025-09-01"},
+            {"habit_id": habit_id, "log_date": "2025-09-02"},
+        ]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    [habit] = response.json["habits"]
+    assert habit["id"] == habit_id
+    assert habit["total_completions"] == 2
+    assert habit["current_streak"] == 2
+
+    # Other devices pick up the new counters through the delta
+    response = client.get(f"/api/v1/sync?since={token}", headers=headers)
+    [habit] = response.json["habits"]
+    assert habit["total_completions"] == 2
+    assert habit["last_log_date"] == "2025-09-02"
+    assert len(response.json["habit_logs"]) == 2
+
+
+def test_push_rejects_other_users_rows(auth_client):
+    client, headers = auth_client
+    response = client.post(
+        "/api/v1/sync",
+        json={"habit_logs": [{"habit_id": 999, "log_date": "2025-09-01"}]},
+        headers=headers
+    )
+    assert response.status_code == 404
+
+
+def test_push_rejects_malformed_envelopes(auth_client):
+    client, headers = auth_client
+    for body in (
+        [{"name": "Walk"}],
+        {"habits": "x"},
+        {"habits": [1]},
+        {"deleted": []},
+        {"deleted": {"habits": [[1]]}},
+        {"mood_logs": [{"id": "1", "rating": 3}]},
+        {"habit_logs": [{"habit_id": [1], "log_date": "2025-09-01"}]},
+    ):
+        response = client.post("/api/v1/sync", json=body, headers=headers)
+        assert response.status_code == 400, body
+    assert Habit.query.count() == 0
+
+
+def test_pull_rejects_malformed_token(auth_client):
+    client, headers = auth_client
+    response = client.get("/api/v1/sync?since=abc", headers=headers)
+    assert response.status_code == 400
+    assert "since" in response.json